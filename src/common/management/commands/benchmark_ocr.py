@@ -0,0 +1,112 @@
+"""Management command to benchmark the ocr engines."""
+import json
+import os
+import platform
+import sys
+
+import cv2
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from common.utils.ocr.benchmark import benchmark_engine
+from common.utils.ocr.corpus import load_corpus
+from common.utils.ocr.engines import ENGINE_CLASSES, TemplateEngine, get_engine_by_name
+from common.utils.ocr.preprocess import b64_to_grey
+
+ENGINE_NAMES = [TemplateEngine.name] + [engine.name for engine in ENGINE_CLASSES]
+
+
+def load_fixtures(path: str):
+    """Return (label, base64 image) pairs for the digits in a fixtures file."""
+    with open(path) as fyle:
+        b64_images = json.load(fyle)
+    return [(label, image) for label, image in b64_images.items() if label.isdigit()]
+
+
+class Command(BaseCommand):
+    """Management command to benchmark the ocr engines."""
+
+    help = (
+        "Report the per stage timings, throughput and accuracy of the ocr engines"
+        " on labelled keypad images as json."
+    )
+
+    def add_arguments(self, parser):
+        """Add engine, repeat, fixtures and output arguments."""
+        default_fixtures = os.path.join(
+            apps.get_app_config("common").path, "tests", "base64_images.json"
+        )
+        parser.add_argument(
+            "--engine",
+            action="append",
+            choices=ENGINE_NAMES,
+            help="An engine to benchmark (repeatable). Default: all available",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=10,
+            help="The number of times each image is recognised. Default: 10",
+        )
+        parser.add_argument(
+            "--fixtures",
+            default=default_fixtures,
+            help=(
+                "A json file of base64 encoded images keyed by the digit they"
+                f" show. Default: {default_fixtures}"
+            ),
+        )
+        parser.add_argument(
+            "--corpus",
+            help=(
+                "A synthetic corpus (see generate_keypad_corpus) to use instead"
+                " of the fixtures."
+            ),
+        )
+        parser.add_argument(
+            "--output", help="Write the results to this file instead of stdout."
+        )
+
+    def handle(self, *args, **options):
+        """Run the management command."""
+        source = options["corpus"] or options["fixtures"]
+        decode = b64_to_grey
+        if options["corpus"]:
+            images, labels = load_corpus(options["corpus"])
+            labelled = list(zip(map(str, labels), images))
+            decode = None
+        else:
+            labelled = load_fixtures(options["fixtures"])
+        if not labelled:
+            raise CommandError(f"No labelled digits in {source}")
+        results = []
+        for name in options["engine"] or ENGINE_NAMES:
+            try:
+                engine = get_engine_by_name(name)
+            except Exception as error:  # pylint: disable=broad-except
+                if options["engine"]:
+                    raise CommandError(f"{name} is unavailable: {error}") from error
+                self.stderr.write(f"Skipping {name} since it is unavailable: {error}")
+                continue
+            results.append(
+                benchmark_engine(engine, labelled, options["repeat"], decode=decode)
+            )
+        report = {
+            "created": now().isoformat(),
+            "source": source,
+            "repeat": options["repeat"],
+            "environment": {
+                "python": sys.version.split()[0],
+                "opencv": cv2.__version__,
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+            },
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fyle:
+                fyle.write(output)
+        else:
+            self.stdout.write(output)
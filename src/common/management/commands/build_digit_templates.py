@@ -0,0 +1,55 @@
+"""Management command to build the templates of the digits on ING's keypad."""
+from django.core.management.base import BaseCommand
+
+from common.utils.ocr.corpus import TileCorpusGenerator, load_corpus
+from common.utils.ocr.preprocess import binarise_grey
+from common.utils.ocr.templates import DIGIT_TEMPLATES_PATH, TemplateClassifier
+
+
+class Command(BaseCommand):
+    """Management command to build the templates of the digits on ING's keypad."""
+
+    help = (
+        "Build the digit templates from a labelled corpus, by default of jittered"
+        " copies of ING's keypad tiles."
+    )
+
+    def add_arguments(self, parser):
+        """Add the corpus, its size and seed and the output path."""
+        parser.add_argument(
+            "--corpus",
+            help=(
+                "A corpus (see generate_keypad_corpus) to build the templates from"
+                " instead of jittering ING's tiles."
+            ),
+        )
+        parser.add_argument(
+            "--count", type=int, default=2000, help="Default: 2000 jittered tiles"
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed the jitter. Default: 0"
+        )
+        parser.add_argument(
+            "--output",
+            default=DIGIT_TEMPLATES_PATH,
+            help=f"Default: {DIGIT_TEMPLATES_PATH}",
+        )
+
+    def handle(self, *args, **options):
+        """Run the management command."""
+        if options["corpus"]:
+            images, labels = load_corpus(options["corpus"])
+        else:
+            generator = TileCorpusGenerator(seed=options["seed"])
+            images, labels = generator.generate(options["count"])
+        for image in images:
+            binarise_grey(image, dst=image)
+        classifier = TemplateClassifier.from_images(
+            [str(label) for label in labels], images
+        )
+        classifier.save(options["output"])
+        if options["verbosity"]:
+            self.stdout.write(
+                f"Wrote {len(classifier.labels)} templates built from"
+                f" {len(labels)} tiles to {options['output']}"
+            )
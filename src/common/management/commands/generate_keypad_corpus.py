@@ -0,0 +1,84 @@
+"""Management command to generate a synthetic corpus of keypad digits."""
+from django.core.management.base import BaseCommand
+
+from common.utils.ocr.corpus import (
+    DEFAULT_FONT_PATH,
+    CorpusGenerator,
+    TileCorpusGenerator,
+    save_corpus,
+)
+
+
+class Command(BaseCommand):
+    """Management command to generate a synthetic corpus of keypad digits."""
+
+    help = "Render labelled keypad digit tiles into an npz file."
+
+    def add_arguments(self, parser):
+        """Add the output path and the options varying the tiles."""
+        parser.add_argument("output", help="The npz file to write the corpus to.")
+        parser.add_argument(
+            "--count", type=int, default=10000, help="Default: 10000 tiles"
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Seed the randomness to repeat a corpus."
+        )
+        parser.add_argument(
+            "--font", default=DEFAULT_FONT_PATH, help=f"Default: {DEFAULT_FONT_PATH}"
+        )
+        parser.add_argument(
+            "--tiles",
+            action="store_true",
+            help="Jitter ING's keypad tiles instead of rendering the font.",
+        )
+        parser.add_argument(
+            "--min-scale",
+            type=float,
+            default=0.8,
+            help="The smallest font size relative to ING's. Default: 0.8",
+        )
+        parser.add_argument(
+            "--max-scale",
+            type=float,
+            default=1.25,
+            help="The largest font size relative to ING's. Default: 1.25",
+        )
+        parser.add_argument(
+            "--max-offset",
+            type=int,
+            nargs=2,
+            default=[40, 20],
+            metavar=("X", "Y"),
+            help="The furthest a digit is moved from the centre. Default: 40 20",
+        )
+        parser.add_argument(
+            "--noise",
+            type=float,
+            default=4.0,
+            help="The standard deviation of the pixel noise. Default: 4",
+        )
+        parser.add_argument(
+            "--invert",
+            type=float,
+            default=0.0,
+            help="The proportion of tiles with inverted colours. Default: 0",
+        )
+
+    def handle(self, *args, **options):
+        """Run the management command."""
+        variation = {
+            "seed": options["seed"],
+            "scale": (options["min_scale"], options["max_scale"]),
+            "max_offset": tuple(options["max_offset"]),
+            "noise": options["noise"],
+        }
+        if options["tiles"]:
+            generator = TileCorpusGenerator(**variation)
+        else:
+            generator = CorpusGenerator(
+                font_path=options["font"], invert=options["invert"], **variation
+            )
+        images, labels = generator.generate(options["count"])
+        save_corpus(options["output"], images, labels)
+        if options["verbosity"]:
+            self.stdout.write(f"Wrote {len(labels)} tiles to {options['output']}")
@@ -1,4 +1,9 @@
 """Project-wide pagination classes."""
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param
 from rest_framework_json_api import pagination
 
 
@@ -6,3 +11,49 @@ class JsonApiPageNumberPagination(pagination.JsonApiPageNumberPagination):
     """Increase the max page size."""
 
     max_page_size = 10000
+
+
+class JsonApiCursorPagination(CursorPagination):
+    """
+    A json-api compatible keyset pagination format.
+
+    Pages are found by seeking past the ordering field's value in the cursor
+    (use an indexed, unique field) rather than counting and offsetting, so deep
+    pages cost the same as the first. The total count is only included when
+    `include_count` is set, and there is no last page.
+    """
+
+    cursor_query_param = "page[cursor]"
+    page_size_query_param = "page[size]"
+    max_page_size = 10000
+    ordering = "pk"
+    include_count = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Count the results (if enabled) and return a page of them."""
+        self.count = queryset.count() if self.include_count else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_first_link(self):
+        """Return the link to the first page."""
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        """Return the page with json-api links to the adjacent pages."""
+        meta = OrderedDict([("page_size", self.page_size)])
+        if self.count is not None:
+            meta["count"] = self.count
+        return Response(
+            {
+                "results": data,
+                "meta": {"pagination": meta},
+                "links": OrderedDict(
+                    [
+                        ("first", self.get_first_link()),
+                        ("last", None),
+                        ("next", self.get_next_link()),
+                        ("prev", self.get_previous_link()),
+                    ]
+                ),
+            }
+        )
@@ -0,0 +1,37 @@
+"""Project-wide parser classes."""
+import io
+
+from django.conf import settings
+from rest_framework import parsers as drf_parsers
+from rest_framework_json_api import parsers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONParser(drf_parsers.JSONParser):
+    """
+    JSON parser decoding with orjson, when it is installed.
+
+    Only utf-8 bodies are decoded by orjson. Anything it cannot decode is
+    parsed again by the stdlib, so errors (and edge cases, such as integers
+    beyond 64 bits) are handled exactly as by drf's parser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the json body."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class JSONParser(parsers.JSONParser, FastJSONParser):
+    """JSON:API parser which decodes with the fast parser."""
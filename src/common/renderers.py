@@ -0,0 +1,129 @@
+"""Project-wide renderer classes."""
+import decimal
+import math
+from typing import Iterable, Iterator, List
+
+from rest_framework import renderers as drf_renderers
+from rest_framework.utils.serializer_helpers import ReturnList
+from rest_framework_json_api import renderers, utils
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# characters which are valid json but not javascript, escaped as drf does
+UNSAFE_SEPARATORS = [
+    ("\u2028".encode("utf-8"), b"\\u2028"),
+    ("\u2029".encode("utf-8"), b"\\u2029"),
+]
+
+
+def _has_non_finite(data) -> bool:
+    """Return whether the data contains a NaN or infinite float (or decimal)."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, decimal.Decimal):
+        return not data.is_finite()
+    if isinstance(data, dict):
+        return any(map(_has_non_finite, data.keys())) or any(
+            map(_has_non_finite, data.values())
+        )
+    if isinstance(data, (list, tuple)):
+        return any(map(_has_non_finite, data))
+    return False
+
+
+class FastJSONRenderer(drf_renderers.JSONRenderer):
+    """
+    JSON renderer encoding with orjson, when it is installed.
+
+    The output is the same as drf's renderer (compact, unescaped unicode and
+    drf's encoding of other types), except that floats in exponent notation
+    are written in their shortest form (e.g. `1e16` rather than `1e+16`). The
+    stdlib is used instead for anything orjson would render differently:
+    indented or non-compact output, escaped unicode, data orjson cannot encode
+    (e.g. integers beyond 64 bits) and NaN or infinite floats, which orjson
+    writes as null where drf raises ValueError (or writes `NaN` if not strict).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render the data into json, returning bytes."""
+        renderer_context = renderer_context or {}
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # only data rendered with nulls can have had non-finite floats in it
+        if b"null" in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        for character, escaped in UNSAFE_SEPARATORS:
+            ret = ret.replace(character, escaped)
+        return ret
+
+
+class JSONRenderer(renderers.JSONRenderer, FastJSONRenderer):
+    """
+    JSON:API renderer which can also stream lists of resources.
+
+    Documents are built by the JSON:API renderer and encoded by the fast one.
+    """
+
+    def render_resources(self, serializer_data: ReturnList, renderer_context) -> List:
+        """Return the resource objects of a list serializer's data."""
+        serializer = serializer_data.serializer
+        resource_name = utils.get_resource_name(renderer_context)
+        fields = utils.get_serializer_fields(serializer.child)
+        force_type_resolution = getattr(
+            serializer.child, "_poly_force_type_resolution", False
+        )
+        resources = []
+        for resource, instance in zip(serializer_data, serializer.instance):
+            json_resource_obj = self.build_json_resource_obj(
+                fields, resource, instance, resource_name, force_type_resolution
+            )
+            meta = self.extract_meta(serializer, resource)
+            if meta:
+                json_resource_obj["meta"] = utils.format_field_names(meta)
+            resources.append(json_resource_obj)
+        return resources
+
+    def render_stream(
+        self,
+        pages: Iterable[ReturnList],
+        accepted_media_type=None,
+        renderer_context=None,
+    ) -> Iterator[bytes]:
+        """
+        Render a document of the resources in each page of serializer data.
+
+        The document is yielded a page at a time, so only one page is ever held
+        in memory. Only the primary data is rendered (not included resources).
+        """
+        renderer_context = renderer_context or {}
+        separator = b""
+        yield b'{"data":['
+        for page in pages:
+            resources = self.render_resources(page, renderer_context)
+            if not resources:
+                continue
+            yield separator + b",".join(
+                FastJSONRenderer.render(
+                    self, resource, accepted_media_type, renderer_context
+                )
+                for resource in resources
+            )
+            separator = b","
+        yield b"]}"
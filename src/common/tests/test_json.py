@@ -0,0 +1,83 @@
+"""Test the fast json renderer and parser match drf's."""
+import datetime
+import decimal
+import io
+import uuid
+from unittest import skipIf
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from common import parsers, renderers
+
+DATA = {
+    "text": 'caf\u00e9 \u2028 \u2029 \U0001f600 "quoted" \\ </script>',
+    "lazy": gettext_lazy("users"),
+    "numbers": [0, -1, 1.5, 0.1, decimal.Decimal("1.10"), True, None],
+    "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5, 678901, datetime.timezone.utc),
+    "date": datetime.date(2020, 1, 2),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    1: "integer key",
+}
+
+
+@skipIf(renderers.orjson is None, "orjson is not installed")
+class JsonTestCase(SimpleTestCase):
+    """Test the fast json renderer and parser match drf's."""
+
+    def test_render(self):
+        """Data is rendered as drf's renderer would."""
+        fast = renderers.FastJSONRenderer()
+        # integers beyond 64 bits are rendered by the stdlib
+        for data in [DATA, [DATA], {"data": []}, {"big": 2 ** 70}, "", None]:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    JSONRenderer().render(data, "application/json"),
+                    fast.render(data, "application/json"),
+                )
+
+    def test_render_non_finite(self):
+        """NaN and infinite floats are rejected, as drf's renderer would."""
+        for data in [
+            {"nan": float("nan")},
+            {"infinities": [float("inf"), -float("inf")]},
+            {"decimal": [decimal.Decimal("NaN")]},
+            {float("inf"): None},
+        ]:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    renderers.FastJSONRenderer().render(data, "application/json")
+
+        class NotStrict(renderers.FastJSONRenderer):
+            strict = False
+
+        data = {"nan": float("nan"), "none": None}
+        self.assertEqual(
+            NotStrict().render(data, "application/json"), b'{"nan":NaN,"none":null}'
+        )
+
+    def test_render_fallback(self):
+        """Indented json is rendered by the stdlib."""
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type),
+        )
+
+    def test_parse(self):
+        """Bodies are parsed as drf's parser would."""
+        body = JSONRenderer().render({**DATA, "big": 2 ** 70})
+        self.assertEqual(
+            parsers.FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+        for body in [b"{", b'{"number": NaN}', b"\xff"]:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    JSONParser().parse(io.BytesIO(body))
+                with self.assertRaises(ParseError) as parsed:
+                    parsers.FastJSONParser().parse(io.BytesIO(body))
+                self.assertEqual(str(parsed.exception), str(expected.exception))
@@ -1,13 +1,98 @@
 """Test ocr utils work as expected."""
+import asyncio
+import base64
+import json
+import os
+import tempfile
+from io import StringIO
+
+import cv2
+import numpy
+from django.core.management import call_command
 from django.test import SimpleTestCase
 
 from common.tests import factories
 from common.utils import ocr
+from common.utils.ocr import (
+    aio,
+    cache,
+    corpus,
+    engines,
+    executor,
+    montage,
+    preprocess,
+    strategies,
+    templates,
+)
+
+
+class UnavailableEngine(engines.OcrEngine):
+    """Engine which fails if it is used."""
+
+    def image_to_text(self, image, single_char=False):
+        """Fail if called."""
+        raise AssertionError("The engine should not have been used.")
+
+    def image_to_chars(self, image, whitelist=""):
+        """Fail if called."""
+        raise AssertionError("The engine should not have been used.")
+
+    def image_to_result(self, image, psm=engines.PSM_SINGLE_CHAR, whitelist=""):
+        """Fail if called."""
+        raise AssertionError("The engine should not have been used.")
+
+
+class ScriptedEngine(engines.OcrEngine):
+    """Engine which returns a fixed result for each page segmentation mode."""
+
+    def __init__(self, results):
+        """Set the result for each page segmentation mode."""
+        self.results = results
+        self.calls = []
+
+    def image_to_result(self, image, psm=engines.PSM_SINGLE_CHAR, whitelist=""):
+        """Return the result for the page segmentation mode."""
+        self.calls.append(psm)
+        return self.results[psm]
+
+
+def held_out_corpus(count):
+    """
+    Return greyscale tiles jittered from the fixtures, and their labels.
+
+    The tiles are seeded and varied differently from those the digit templates
+    are built from.
+    """
+    tiles = {
+        int(label): preprocess.b64_to_grey(b64_image)
+        for label, b64_image in factories.base64_images.items()
+        if label.isdigit()
+    }
+    return corpus.TileCorpusGenerator(
+        tiles, seed=1, scale=(0.8, 1.25), max_offset=(30, 15), noise=5.0
+    ).generate(count)
+
+
+def binarised(images):
+    """Return the greyscale images binarised."""
+    return [preprocess.binarise_grey(image) for image in images]
+
+
+def upside_down_two():
+    """Return a binarised 2 turned upside down, which is close to (but not) a 5."""
+    image = ocr.binarise(ocr.b64_to_image(factories.base64_images["2"]))
+    return numpy.ascontiguousarray(image[::-1])
 
 
 class TestCase(SimpleTestCase):
     """Test ocr works as expected."""
 
+    def setUp(self):
+        """Start each test with an empty digit cache."""
+        super().setUp()
+        cache.set_digit_cache(cache.DigitCache())
+        self.addCleanup(cache.set_digit_cache, None)
+
     def test_image_to_int(self):
         """Images containing only ints can be converted to integers."""
         expected_int = 3
@@ -32,3 +117,311 @@ class TestCase(SimpleTestCase):
         )
         self.assertIn("with Text", text)
         self.assertIn("1", text)
+
+    def test_images_to_ints(self):
+        """A batch of images containing only ints can be converted together."""
+        expected_ints = [3, 1, 4, 1, 5, 9, 2, 6, 8, 7, 0]
+        b64_images = [factories.base64_images[str(i)] for i in expected_ints]
+        self.assertEqual(ocr.b64_images_to_ints(b64_images), expected_ints)
+
+    def test_images_to_ints_with_text(self):
+        """A batch containing non int characters results in a ValueError."""
+        with self.assertRaises(ValueError):
+            ocr.b64_images_to_ints(
+                [
+                    factories.base64_images["1"],
+                    factories.base64_images["image_with_text"],
+                ]
+            )
+
+    def test_image_to_result(self):
+        """Digits are read with their confidence, unreadable images do not raise."""
+        results = ocr.b64_images_to_results(
+            [factories.base64_images["8"], factories.base64_images["image_with_text"]]
+        )
+        self.assertEqual(results[0].text, "8")
+        self.assertGreaterEqual(results[0].confidence, strategies.MIN_CONFIDENCE)
+        self.assertFalse(
+            strategies.is_digit(results[1])
+            and results[1].confidence >= strategies.MIN_CONFIDENCE
+        )
+
+    def test_engine_results(self):
+        """Every available engine reports its confidence in each character."""
+        image = ocr.binarise(ocr.b64_to_image(factories.base64_images["3"]))
+        for engine_class in engines.ENGINE_CLASSES + [engines.TemplateEngine]:
+            with self.subTest(engine=engine_class.name):
+                try:
+                    engine = engine_class()
+                except Exception as error:  # pylint: disable=broad-except
+                    self.skipTest(f"{engine_class.name} is unavailable: {error}")
+                result = engine.image_to_result(image, whitelist=strategies.DIGITS)
+                self.assertEqual(result.text, "3")
+                self.assertEqual(len(result.confidences), 1)
+                self.assertGreater(result.confidence, 0.9)
+
+    def test_read_digit(self):
+        """Slower strategies are only tried until a digit is read confidently."""
+        image = ocr.binarise(ocr.b64_to_image(factories.base64_images["2"]))
+        engine = ScriptedEngine(
+            {
+                engines.PSM_SINGLE_CHAR: engines.OcrResult("2", (0.95,)),
+                engines.PSM_SINGLE_WORD: engines.OcrResult("7", (0.99,)),
+            }
+        )
+        self.assertEqual(strategies.read_digit(engine, image).text, "2")
+        self.assertEqual(engine.calls, [engines.PSM_SINGLE_CHAR])
+
+        engine = ScriptedEngine(
+            {
+                engines.PSM_SINGLE_CHAR: engines.OcrResult("2", (0.5,)),
+                engines.PSM_SINGLE_WORD: engines.OcrResult("72", (0.99, 0.99)),
+            }
+        )
+        result = strategies.read_digit(engine, image)
+        self.assertEqual(result, engines.OcrResult("2", (0.5,)))
+        self.assertEqual(len(engine.calls), len(strategies.DIGIT_STRATEGIES))
+
+        engine.calls.clear()
+        strategies.read_digit(engine, image, budget=0)
+        self.assertEqual(engine.calls, [engines.PSM_SINGLE_CHAR])
+
+    def test_montage(self):
+        """Each image is tiled into its own equally sized cell."""
+        images = [
+            ocr.binarise(ocr.b64_to_image(factories.base64_images[str(i)]))
+            for i in range(3)
+        ]
+        tiled = montage.build_montage(images)
+        cell_width = tiled.shape[1] // len(images)
+        for index, image in enumerate(images):
+            with self.subTest(index=index):
+                cell = tiled[:, index * cell_width : (index + 1) * cell_width]
+                self.assertEqual(
+                    (cell == 0).sum(), (montage.crop_to_content(image) == 0).sum()
+                )
+
+    def test_montage_to_digits(self):
+        """Every digit in a montage is recognised from a single ocr pass."""
+        expected_ints = [7, 0, 2, 9]
+        images = [
+            ocr.binarise(ocr.b64_to_image(factories.base64_images[str(i)]))
+            for i in expected_ints
+        ]
+        tiled = montage.build_montage(images)
+        for engine_class in engines.ENGINE_CLASSES:
+            with self.subTest(engine=engine_class.name):
+                try:
+                    engine = engine_class()
+                except Exception as error:  # pylint: disable=broad-except
+                    self.skipTest(f"{engine_class.name} is unavailable: {error}")
+                digits = montage.montage_to_digits(engine, tiled, len(images))
+                self.assertEqual(digits, expected_ints)
+
+    def test_engines(self):
+        """Every available engine can recognise digits."""
+        for engine_class in engines.ENGINE_CLASSES:
+            with self.subTest(engine=engine_class.name):
+                try:
+                    engine = engine_class()
+                except Exception as error:  # pylint: disable=broad-except
+                    self.skipTest(f"{engine_class.name} is unavailable: {error}")
+                image = ocr.binarise(ocr.b64_to_image(factories.base64_images["7"]))
+                text = engine.image_to_text(image, single_char=True)
+                self.assertEqual(ocr.strip_non_alphanumerical(text), "7")
+
+    def test_digit_cache(self):
+        """Digits which have been recognised before skip the engine."""
+        b64_images = [factories.base64_images[str(i)] for i in range(10)]
+        self.assertEqual(ocr.b64_images_to_ints(b64_images), list(range(10)))
+        engine = engines.get_engine()
+        engines.set_engine(UnavailableEngine())
+        self.addCleanup(engines.set_engine, engine)
+        for expected_int in range(10):
+            with self.subTest(expected_int=expected_int):
+                self.assertEqual(
+                    ocr.b64_image_to_int(factories.base64_images[str(expected_int)]),
+                    expected_int,
+                )
+
+    def test_digit_cache_key(self):
+        """The same glyph has the same key wherever it is in the image."""
+        image = ocr.binarise(ocr.b64_to_image(factories.base64_images["5"]))
+        shifted = numpy.roll(image, (7, -11), axis=(0, 1))
+        self.assertEqual(
+            cache.image_key(ocr.crop_to_content(image)),
+            cache.image_key(ocr.crop_to_content(shifted)),
+        )
+        other = ocr.binarise(ocr.b64_to_image(factories.base64_images["6"]))
+        self.assertNotEqual(
+            cache.image_key(ocr.crop_to_content(image)),
+            cache.image_key(ocr.crop_to_content(other)),
+        )
+
+    def test_digit_cache_eviction(self):
+        """The least recently used digits are evicted first."""
+        digit_cache = cache.DigitCache(maxsize=2)
+        digit_cache.set("a", 1)
+        digit_cache.set("b", 2)
+        digit_cache.get("a")
+        digit_cache.set("c", 3)
+        self.assertEqual(digit_cache.get_many(["a", "b", "c"]), [1, None, 3])
+
+    def test_template_classifier(self):
+        """Digits the templates were not built from are classified in one batch."""
+        images, expected_labels = held_out_corpus(200)
+        labels, scores = templates.get_digit_classifier().classify(binarised(images))
+        matched = (scores >= engines.TemplateEngine.threshold) & (
+            numpy.array(labels) == expected_labels.astype(str)
+        )
+        self.assertGreaterEqual(matched.mean(), 0.97)
+
+    def test_template_classifier_near_miss(self):
+        """Images which merely resemble a digit score below the threshold."""
+        images = [
+            ocr.binarise(ocr.b64_to_image(factories.base64_images["image_with_text"])),
+            upside_down_two(),
+        ]
+        labels, scores = templates.get_digit_classifier().classify(images)
+        # the upside down 2 is closest to a 5, and clearly like one
+        self.assertEqual(labels[1], "5")
+        self.assertGreater(scores[1], 0.75)
+        self.assertLess(max(scores), engines.TemplateEngine.threshold)
+
+    def test_template_engine(self):
+        """Only images which do not match a template use the fallback engine."""
+        engine = engines.TemplateEngine(UnavailableEngine())
+        for expected_int in range(10):
+            with self.subTest(expected_int=expected_int):
+                image = ocr.b64_to_image(factories.base64_images[str(expected_int)])
+                text = engine.image_to_text(ocr.binarise(image), single_char=True)
+                self.assertEqual(text, str(expected_int))
+        image = ocr.b64_to_image(factories.base64_images["image_with_text"])
+        for image in [ocr.binarise(image), upside_down_two()]:
+            with self.assertRaisesRegex(AssertionError, "should not have been used"):
+                engine.image_to_text(image, single_char=True)
+
+    def test_build_digit_templates(self):
+        """Templates are the mean of their examples and can be rebuilt."""
+        images, expected_labels = held_out_corpus(20)
+        expected_labels = [str(label) for label in expected_labels]
+        classifier = templates.TemplateClassifier.from_images(
+            expected_labels, binarised(images)
+        )
+        self.assertEqual(classifier.labels, [str(label) for label in range(10)])
+        numpy.testing.assert_allclose(
+            numpy.linalg.norm(classifier.templates, axis=1), 1, rtol=1e-5
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "templates.npz")
+            call_command("build_digit_templates", count=100, output=path, verbosity=0)
+            built = templates.TemplateClassifier.load(path)
+        self.assertEqual(built.labels, classifier.labels)
+        labels, _ = built.classify(binarised(images))
+        self.assertEqual(labels, expected_labels)
+
+    def test_executor(self):
+        """Images are recognised in parallel and returned in order."""
+        self.addCleanup(executor.shutdown_executor)
+        expected_ints = [5, 3, 0, 8, 1, 9, 2]
+        b64_images = [factories.base64_images[str(i)] for i in expected_ints]
+        self.assertEqual(executor.map_b64_images_to_ints(b64_images), expected_ints)
+        self.assertEqual(
+            executor.map_keypads_to_ints([b64_images[:3], b64_images[3:]]),
+            [expected_ints[:3], expected_ints[3:]],
+        )
+        future = executor.submit_b64_image_to_int(factories.base64_images["6"])
+        self.assertEqual(future.result(), 6)
+
+    def test_binarise_batch(self):
+        """Same sized images are binarised into one (reusable) stack."""
+        b64_images = [factories.base64_images[str(i)] for i in range(10)]
+        stack = preprocess.b64_images_to_binarised(b64_images)
+        self.assertEqual(stack.shape, (10, 110, 180))
+        self.assertEqual(set(numpy.unique(stack)), {0, 255})
+        # the text is black on a white background
+        self.assertGreater((stack == 255).sum(), (stack == 0).sum())
+        reused = preprocess.b64_images_to_binarised(b64_images[::-1], out=stack)
+        self.assertIs(reused, stack)
+        self.assertEqual(ocr.binarised_to_ints(reused), list(range(10))[::-1])
+
+    def test_binarise_batch_mixed_sizes(self):
+        """Differently sized images are binarised individually."""
+        image = ocr.b64_to_image(factories.base64_images["1"])
+        _, encoded = cv2.imencode(".png", cv2.resize(image, None, fx=2, fy=2))
+        b64_images = [
+            factories.base64_images["1"],
+            base64.b64encode(encoded.tobytes()).decode("utf-8"),
+        ]
+        binarised = preprocess.b64_images_to_binarised(b64_images)
+        self.assertEqual([image.shape for image in binarised], [(110, 180), (220, 360)])
+
+    def test_benchmark(self):
+        """The benchmark reports the timings and accuracy of an engine."""
+        stdout = StringIO()
+        call_command("benchmark_ocr", engine=["templates"], repeat=2, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(len(report["results"]), 1)
+        result = report["results"][0]
+        self.assertEqual(result["engine"], "templates")
+        self.assertEqual(result["images"], 20)
+        self.assertEqual(
+            set(result["stages"]), {"decode", "threshold", "recognise", "total"}
+        )
+        self.assertIn("p99_ms", result["stages"]["recognise"])
+
+    def test_benchmark_held_out(self):
+        """The templates are accurate on tiles they were not built from."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.npz")
+            corpus.save_corpus(path, *held_out_corpus(100))
+            stdout = StringIO()
+            call_command(
+                "benchmark_ocr",
+                engine=["templates"],
+                corpus=path,
+                repeat=1,
+                stdout=stdout,
+            )
+        result = json.loads(stdout.getvalue())["results"][0]
+        self.assertEqual(result["images"], 100)
+        self.assertGreaterEqual(result["accuracy"], 0.97)
+
+    def test_corpus(self):
+        """A generated corpus can be saved, loaded and benchmarked."""
+        images, labels = corpus.CorpusGenerator(seed=1).generate(20)
+        self.assertEqual(images.shape, (20, 110, 180))
+        self.assertEqual(sorted(labels), sorted(list(range(10)) * 2))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.npz")
+            corpus.save_corpus(path, images, labels)
+            loaded_images, loaded_labels = corpus.load_corpus(path)
+            numpy.testing.assert_array_equal(loaded_images, images)
+            numpy.testing.assert_array_equal(loaded_labels, labels)
+            stdout = StringIO()
+            call_command(
+                "benchmark_ocr",
+                engine=["templates"],
+                corpus=path,
+                repeat=1,
+                stdout=stdout,
+            )
+        result = json.loads(stdout.getvalue())["results"][0]
+        self.assertEqual(result["images"], 20)
+        self.assertNotIn("decode", result["stages"])
+
+    def test_async(self):
+        """Images can be recognised concurrently from asyncio code."""
+        self.addCleanup(executor.shutdown_executor)
+        expected_ints = [4, 8, 1, 5]
+        b64_images = [factories.base64_images[str(i)] for i in expected_ints]
+
+        async def recognise():
+            return await asyncio.gather(
+                aio.ab64_images_to_ints(b64_images),
+                *[aio.ab64_image_to_int(b64_image) for b64_image in b64_images],
+            )
+
+        keypad, *digits = asyncio.run(recognise())
+        self.assertEqual(keypad, expected_ints)
+        self.assertEqual(digits, expected_ints)
@@ -0,0 +1,151 @@
+"""Utils for running optical character recognition (ocr) on images."""
+import re
+from typing import List, Sequence, cast
+
+import numpy
+
+from common.utils.ocr.cache import get_digit_cache, image_key
+from common.utils.ocr.engines import OcrResult, get_engine
+from common.utils.ocr.montage import crop_to_content
+from common.utils.ocr.preprocess import b64_images_to_binarised, b64_to_image, binarise
+from common.utils.ocr.strategies import MIN_CONFIDENCE, is_digit, read_digit
+
+NON_ALPHANUMERICAL_REGEX = re.compile(r"[\W_]+")
+
+
+def strip_non_alphanumerical(text: str) -> str:
+    """Strip out all non-alphanumerical characters."""
+    return NON_ALPHANUMERICAL_REGEX.sub("", text)
+
+
+def image_to_text(image: numpy.ndarray, single_char=False, strip=True) -> str:
+    """Return the result of running ocr on the image (numpy array)."""
+    ocr_text = get_engine().image_to_text(binarise(image), single_char=single_char)
+    if strip:
+        ocr_text = strip_non_alphanumerical(ocr_text)
+    return ocr_text
+
+
+def b64_image_to_text(b64_image: str, single_char=False, strip=True) -> str:
+    """Return the result of running ocr on a base64 encoded string."""
+    opencv_image = b64_to_image(b64_image)
+    return image_to_text(opencv_image, single_char=single_char, strip=strip)
+
+
+def text_to_int(text: str) -> int:
+    """
+    Return the text as an int.
+
+    Raises ValueError if the text is not an integer.
+    """
+    try:
+        return int(text)
+    except ValueError as error:
+        raise ValueError(f'Image does not contain an integer: "{text}"') from error
+
+
+def b64_image_to_int(b64_image: str, single_char=True, strip=True) -> int:
+    """
+    Return the result as an int of running ocr on a base64 encoded string.
+
+    Single characters are looked up in the digit cache before running ocr.
+
+    Raises ValueError if the result is not an integer.
+    """
+    if single_char and strip:
+        return b64_images_to_ints([b64_image])[0]
+    text = b64_image_to_text(b64_image, single_char=single_char, strip=strip)
+    return text_to_int(text)
+
+
+def images_to_ints(images: Sequence[numpy.ndarray]) -> List[int]:
+    """
+    Return the single digit shown in each (BGR) image.
+
+    Raises ValueError if any image does not contain an integer.
+    """
+    return binarised_to_ints([binarise(image) for image in images])
+
+
+def b64_images_to_ints(b64_images: Sequence[str]) -> List[int]:
+    """
+    Return the single digit shown in each base64 encoded image.
+
+    Raises ValueError if any image does not contain an integer.
+    """
+    return binarised_to_ints(b64_images_to_binarised(b64_images))
+
+
+def binarised_to_ints(binarised: Sequence[numpy.ndarray]) -> List[int]:
+    """
+    Return the single digit shown in each binarised image.
+
+    Raises ValueError if any image does not contain an integer.
+    """
+    return [result_to_int(result) for result in binarised_to_results(binarised)]
+
+
+def result_to_int(result: OcrResult) -> int:
+    """
+    Return the digit read as an int.
+
+    Raises ValueError if the result is not a single digit, or was read with
+    less than `MIN_CONFIDENCE` (every strategy only reads digits, so an
+    unreadable image is usually read as an unlikely digit).
+    """
+    if not is_digit(result):
+        raise ValueError(f'Image does not contain a digit: "{result.text}"')
+    if result.confidence < MIN_CONFIDENCE:
+        raise ValueError(
+            f'Image does not clearly contain a digit: "{result.text}"'
+            f" (confidence {result.confidence:.2f})"
+        )
+    return int(result.text)
+
+
+def b64_image_to_result(b64_image: str) -> OcrResult:
+    """Return the digit read from a base64 encoded image with its confidence."""
+    return b64_images_to_results([b64_image])[0]
+
+
+def b64_images_to_results(b64_images: Sequence[str]) -> List[OcrResult]:
+    """Return the digit read from each base64 encoded image with its confidence."""
+    return binarised_to_results(b64_images_to_binarised(b64_images))
+
+
+def binarised_to_results(binarised: Sequence[numpy.ndarray]) -> List[OcrResult]:
+    """
+    Return the digit read from each binarised image with its confidence.
+
+    Digits whose glyph has been seen before are taken from the digit cache.
+    The remaining images are handed to the engine as a single batch (see
+    `OcrEngine.images_to_digits`) and any image whose digit could not be read
+    from the batch is read on its own, escalating through slower strategies
+    while unsure (see `strategies.read_digit`). Digits from the cache or a
+    batch were accepted by an engine and have a confidence of 1.0, and only
+    confident readings are cached.
+
+    Nothing is raised for unreadable images: their result is whatever was read
+    most confidently, which may not be a digit or may not be confident (see
+    `result_to_int`).
+    """
+    if not len(binarised):  # pylint: disable=len-as-condition
+        return []
+    keys = [image_key(crop_to_content(image)) for image in binarised]
+    cache = get_digit_cache()
+    results = [
+        None if digit is None else OcrResult(str(digit), (1.0,))
+        for digit in cache.get_many(keys)
+    ]
+    missing = [index for index, result in enumerate(results) if result is None]
+    engine = get_engine()
+    batch = engine.images_to_digits([binarised[index] for index in missing])
+    for index, digit in zip(missing, batch):
+        if digit is None:
+            result = read_digit(engine, binarised[index])
+        else:
+            result = OcrResult(str(digit), (1.0,))
+        if is_digit(result) and result.confidence >= MIN_CONFIDENCE:
+            cache.set(keys[index], int(result.text))
+        results[index] = result
+    return cast(List[OcrResult], results)
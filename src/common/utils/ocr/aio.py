@@ -0,0 +1,62 @@
+"""
+Run ocr from asyncio code without blocking the event loop.
+
+Recognition is dispatched to the ocr process pool. The number of jobs each
+event loop has in the pool at once is limited (`OCR_MAX_CONCURRENCY`, by
+default the size of the pool), so when many coroutines want ocr at once the
+extras wait their turn instead of queueing unbounded work in the pool.
+"""
+import asyncio
+import weakref
+from typing import List, Sequence
+
+from django.conf import settings
+
+from common.utils import ocr
+from common.utils.ocr import executor
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_max_concurrency() -> int:
+    """Return the most ocr jobs an event loop may run at once."""
+    max_concurrency = None
+    if settings.configured:
+        max_concurrency = getattr(settings, "OCR_MAX_CONCURRENCY", None)
+    return max_concurrency or executor.get_max_workers()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Return the running event loop's semaphore limiting its ocr jobs."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(get_max_concurrency())
+    return semaphore
+
+
+async def _run(func, *args):
+    async with _get_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor.get_executor(), func, *args)
+
+
+async def ab64_image_to_int(b64_image: str) -> int:
+    """
+    Return the digit shown in a base64 encoded image.
+
+    Raises ValueError if the image does not contain an integer.
+    """
+    return await _run(ocr.b64_image_to_int, b64_image)
+
+
+async def ab64_images_to_ints(b64_images: Sequence[str]) -> List[int]:
+    """
+    Return the digit shown in each base64 encoded image (e.g. a keypad).
+
+    The images are recognised together as a single job.
+
+    Raises ValueError if any image does not contain an integer.
+    """
+    return await _run(ocr.b64_images_to_ints, list(b64_images))
@@ -0,0 +1,73 @@
+"""Measure the speed and accuracy of the ocr engines on labelled images."""
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy
+
+from common.utils.ocr.engines import OcrEngine
+from common.utils.ocr.preprocess import b64_to_grey, binarise_grey
+from common.utils.ocr.strategies import read_digit
+
+STAGES = ["decode", "threshold", "recognise"]
+PERCENTILES = [50, 95, 99]
+
+
+def summarise(timings: Sequence[float]) -> Dict[str, float]:
+    """Return the mean and percentiles (in milliseconds) of timings (seconds)."""
+    milliseconds = numpy.asarray(timings) * 1000
+    summary = {"mean_ms": float(milliseconds.mean())}
+    for percentile, value in zip(
+        PERCENTILES, numpy.percentile(milliseconds, PERCENTILES)
+    ):
+        summary[f"p{percentile}_ms"] = float(value)
+    return summary
+
+
+def benchmark_engine(
+    engine: OcrEngine,
+    labelled: Sequence[Tuple[str, Any]],
+    repeat: int = 1,
+    decode: Optional[Callable[[Any], numpy.ndarray]] = b64_to_grey,
+) -> Dict[str, Any]:
+    """
+    Recognise each (label, image) pair `repeat` times with the engine.
+
+    Every image is timed through each stage (decoding, thresholding and
+    recognition, see `strategies.read_digit`) of the ocr pipeline individually.
+    The images are base64 encoded by default, pass `decode=None` for greyscale
+    arrays (e.g. from a synthetic corpus) which need no decoding.
+    """
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES + ["total"]}
+    correct = 0
+    for _ in range(repeat):
+        for label, source in labelled:
+            if decode is None:
+                # copied since the image is thresholded in place
+                image = numpy.array(source)
+                start = decoded = time.perf_counter()
+            else:
+                start = time.perf_counter()
+                image = decode(source)
+                decoded = time.perf_counter()
+            binarise_grey(image, dst=image)
+            thresholded = time.perf_counter()
+            result = read_digit(engine, image)
+            recognised = time.perf_counter()
+            correct += result.text == label
+            if decode is not None:
+                timings["decode"].append(decoded - start)
+            timings["threshold"].append(thresholded - decoded)
+            timings["recognise"].append(recognised - thresholded)
+            timings["total"].append(recognised - start)
+    count = len(timings["total"])
+    return {
+        "engine": engine.name,
+        "images": count,
+        "accuracy": correct / count if count else None,
+        "images_per_second": count / sum(timings["total"]) if count else None,
+        "stages": {
+            stage: summarise(stage_timings)
+            for stage, stage_timings in timings.items()
+            if stage_timings
+        },
+    }
@@ -0,0 +1,148 @@
+"""
+Cache of recognised digits keyed on the content of the digit's image.
+
+ING serves the same digit glyphs over and over (only their position on the
+keypad changes) so once a glyph has been recognised it never needs to go
+through an engine again. Entries are kept in a per process LRU and optionally
+in redis so that every worker shares the hits.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# side length (in pixels) glyphs are normalised to before hashing
+HASH_SIZE = 32
+
+
+def image_key(glyph: numpy.ndarray) -> str:
+    """
+    Return a key identifying a binarised glyph which is cropped to its content.
+
+    The glyph is scaled to a fixed size and its bits are hashed, so the same
+    glyph has the same key regardless of where it sat in the original image.
+    """
+    image = cv2.resize(glyph, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = numpy.packbits(image < 128)
+    return hashlib.blake2b(bits.tobytes(), digest_size=16).hexdigest()
+
+
+class DigitCache:
+    """Two tier (in process LRU and optional redis) cache of digits."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "ocr-digit",
+        timeout: int = 60 * 60 * 24 * 30,
+    ):
+        """Initialise the cache, connecting lazily to redis if a url is given."""
+        self.maxsize = maxsize
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self._local: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+
+    def __len__(self):
+        """Return the number of digits in the local tier."""
+        return len(self._local)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    def _set_local(self, key: str, digit: int):
+        with self._lock:
+            self._local[key] = digit
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[int]:
+        """Return the digit cached for the key, or None if it is not cached."""
+        with self._lock:
+            digit = self._local.get(key)
+            if digit is not None:
+                self._local.move_to_end(key)
+                return digit
+        if self._redis is None:
+            return None
+        try:
+            value = self._redis.get(self._redis_key(key))
+        except redis.RedisError:
+            logger.warning("Unable to read from the ocr digit cache.", exc_info=True)
+            return None
+        if value is None:
+            return None
+        digit = int(value)
+        self._set_local(key, digit)
+        return digit
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[int]]:
+        """Return the digit cached for each key, fetching misses in one query."""
+        with self._lock:
+            digits = [self._local.get(key) for key in keys]
+            for key, digit in zip(keys, digits):
+                if digit is not None:
+                    self._local.move_to_end(key)
+        missing = [index for index, digit in enumerate(digits) if digit is None]
+        if self._redis is None or not missing:
+            return digits
+        try:
+            values = self._redis.mget([self._redis_key(keys[i]) for i in missing])
+        except redis.RedisError:
+            logger.warning("Unable to read from the ocr digit cache.", exc_info=True)
+            return digits
+        for index, value in zip(missing, values):
+            if value is not None:
+                digits[index] = int(value)
+                self._set_local(keys[index], int(value))
+        return digits
+
+    def set(self, key: str, digit: int):
+        """Cache the digit for the key."""
+        self._set_local(key, digit)
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(self._redis_key(key), digit, ex=self.timeout)
+        except redis.RedisError:
+            logger.warning("Unable to write to the ocr digit cache.", exc_info=True)
+
+    def clear(self):
+        """Clear the local tier."""
+        with self._lock:
+            self._local.clear()
+
+
+_digit_cache: Optional[DigitCache] = None
+
+
+def get_digit_cache() -> DigitCache:
+    """
+    Return the process wide digit cache.
+
+    The redis tier is used when django is configured with `OCR_CACHE_REDIS_URL`.
+    """
+    global _digit_cache  # pylint: disable=global-statement
+    if _digit_cache is None:
+        redis_url = None
+        if settings.configured:
+            redis_url = getattr(settings, "OCR_CACHE_REDIS_URL", None)
+        _digit_cache = DigitCache(redis_url=redis_url)
+    return _digit_cache
+
+
+def set_digit_cache(cache: Optional[DigitCache]):
+    """Set the process wide digit cache (None to configure it again)."""
+    global _digit_cache  # pylint: disable=global-statement
+    _digit_cache = cache
@@ -0,0 +1,195 @@
+"""
+Generate labelled synthetic keypad digits for benchmarking and tuning ocr.
+
+Tiles are greyscale at the size of ING's keypad tiles with light digits on a
+darker background, either rendered from a font or jittered copies of ING's own
+tiles, randomly varying the digit's size and position and adding noise. A
+corpus is stored as one uncompressed npz file holding an (N, H, W) uint8
+`images` array and an (N,) uint8 `labels` array, so it can be read without
+decoding any images.
+"""
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+from common.utils.ocr.preprocess import b64_to_grey
+
+# the size (width, height) of the tiles returned by ING's PinpadImages
+TILE_SIZE = (180, 110)
+# the font size at which Arcon's digits are the same height as ING's
+FONT_SIZE = 40
+DEFAULT_FONT_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), *[os.pardir] * 4, "Arcon-Regular.otf"
+)
+# base64 encoded pngs of the tiles of one of ING's keypads, keyed by digit
+KEYPAD_TILES_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "keypad_tiles.json"
+)
+
+
+def load_tiles(path: str = KEYPAD_TILES_PATH) -> Dict[int, numpy.ndarray]:
+    """Return the greyscale tiles in a json file of base64 images keyed by digit."""
+    with open(path) as fyle:
+        b64_images = json.load(fyle)
+    return {
+        int(label): b64_to_grey(b64_image)
+        for label, b64_image in b64_images.items()
+        if label.isdigit()
+    }
+
+
+class BaseCorpusGenerator:
+    """Generate randomly varied keypad digit tiles."""
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        scale: Tuple[float, float] = (0.8, 1.25),
+        max_offset: Tuple[int, int] = (40, 20),
+        noise: float = 4.0,
+    ):
+        """
+        Configure the variation between tiles.
+
+        `scale` is the range of digit sizes relative to ING's, `max_offset` is
+        the furthest (x, y) in pixels a digit is moved from its place and `noise`
+        is the standard deviation of the noise added to each pixel.
+        """
+        self.random = numpy.random.default_rng(seed)
+        self.scale = scale
+        self.max_offset = max_offset
+        self.noise = noise
+
+    def offset(self) -> Tuple[int, int]:
+        """Return a random (x, y) offset within `max_offset`."""
+        return (
+            int(self.random.integers(-self.max_offset[0], 1 + self.max_offset[0])),
+            int(self.random.integers(-self.max_offset[1], 1 + self.max_offset[1])),
+        )
+
+    def add_noise(
+        self, image: numpy.ndarray, out: Optional[numpy.ndarray] = None
+    ) -> numpy.ndarray:
+        """Return the (float) image with noise added as uint8 (written to `out`)."""
+        if self.noise:
+            image = image + self.random.normal(0, self.noise, image.shape)
+        if out is None:
+            out = numpy.empty(image.shape, numpy.uint8)
+        numpy.clip(image, 0, 255, out=image)
+        out[:] = image
+        return out
+
+    def render(self, digit: int, out: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """Return a greyscale tile showing the digit (written to `out` if given)."""
+        raise NotImplementedError
+
+    def generate(self, count: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Return `count` tiles and their labels, with the digits evenly spread."""
+        labels = (numpy.arange(count) % 10).astype(numpy.uint8)
+        self.random.shuffle(labels)
+        images = numpy.empty((count, TILE_SIZE[1], TILE_SIZE[0]), numpy.uint8)
+        for image, label in zip(images, labels):
+            self.render(int(label), out=image)
+        return images, labels
+
+
+class CorpusGenerator(BaseCorpusGenerator):
+    """Render randomly varied keypad digit tiles from a font."""
+
+    def __init__(
+        self,
+        font_path: str = DEFAULT_FONT_PATH,
+        seed: Optional[int] = None,
+        scale: Tuple[float, float] = (0.8, 1.25),
+        max_offset: Tuple[int, int] = (40, 20),
+        noise: float = 4.0,
+        invert: float = 0.0,
+    ):
+        """
+        Configure the variation between tiles.
+
+        Digits are moved from the centre of their tile, and `invert` is the
+        proportion of tiles with dark digits on a light background.
+        """
+        super().__init__(seed, scale, max_offset, noise)
+        self.font_path = font_path
+        self.invert = invert
+        self._fonts = {}
+
+    def font(self, size: int) -> ImageFont.FreeTypeFont:
+        """Return the font at the given size, loading each size only once."""
+        if size not in self._fonts:
+            self._fonts[size] = ImageFont.truetype(self.font_path, size=size)
+        return self._fonts[size]
+
+    def render(self, digit: int, out: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """Return a greyscale tile showing the digit (written to `out` if given)."""
+        background = int(self.random.integers(110, 170))
+        foreground = int(self.random.integers(230, 256))
+        if self.random.random() < self.invert:
+            background, foreground = 255 - background, 255 - foreground
+        tile = Image.new("L", TILE_SIZE, background)
+        size = round(FONT_SIZE * self.random.uniform(*self.scale))
+        offset = self.offset()
+        centre = (TILE_SIZE[0] / 2 + offset[0], TILE_SIZE[1] / 2 + offset[1])
+        ImageDraw.Draw(tile).text(
+            centre, str(digit), fill=foreground, font=self.font(size), anchor="mm"
+        )
+        return self.add_noise(numpy.asarray(tile, dtype=numpy.float32), out=out)
+
+
+class TileCorpusGenerator(BaseCorpusGenerator):
+    """Jitter copies of ING's own keypad tiles."""
+
+    def __init__(
+        self,
+        tiles: Optional[Dict[int, numpy.ndarray]] = None,
+        seed: Optional[int] = None,
+        scale: Tuple[float, float] = (0.9, 1.1),
+        max_offset: Tuple[int, int] = (20, 10),
+        noise: float = 4.0,
+    ):
+        """
+        Configure the variation between tiles.
+
+        `tiles` are greyscale tiles keyed by the digit they show (ING's, see
+        `load_tiles`, by default). Digits are scaled about and moved from the
+        centre of their tile, whose transparent (rounded) corners stay put.
+        """
+        super().__init__(seed, scale, max_offset, noise)
+        self.tiles = {}
+        for digit, tile in (load_tiles() if tiles is None else tiles).items():
+            corners = tile == 0
+            background = numpy.array(tile, numpy.float32)
+            background[corners] = numpy.median(tile[~corners])
+            self.tiles[digit] = (background, corners)
+
+    def render(self, digit: int, out: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """Return a greyscale tile showing the digit (written to `out` if given)."""
+        background, corners = self.tiles[digit]
+        height, width = background.shape
+        matrix = cv2.getRotationMatrix2D(
+            (width / 2, height / 2), 0, self.random.uniform(*self.scale)
+        )
+        matrix[:, 2] += self.offset()
+        image = cv2.warpAffine(
+            background, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE
+        )
+        out = self.add_noise(image, out=out)
+        out[corners] = 0
+        return out
+
+
+def save_corpus(path: str, images: numpy.ndarray, labels: numpy.ndarray):
+    """Save a corpus of tiles and their labels."""
+    numpy.savez(path, images=images, labels=labels)
+
+
+def load_corpus(path: str) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Return the tiles and labels of a saved corpus."""
+    with numpy.load(path) as corpus:
+        return corpus["images"], corpus["labels"]
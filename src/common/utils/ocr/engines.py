@@ -0,0 +1,333 @@
+"""
+Engines which perform the character recognition for the ocr utils.
+
+Engines are handed images which have already been binarised (black text on a
+white background) and only deal with turning them into text.
+"""
+import functools
+import logging
+import threading
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy
+import pytesseract
+
+from common.utils.ocr.montage import build_montage, montage_to_digits
+from common.utils.ocr.templates import get_digit_classifier
+
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - optional dependency
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# (character, left, width) of a character found in an image
+Character = Tuple[str, int, int]
+
+# tesseract's page segmentation modes used by the ocr utils
+PSM_AUTO = 3
+PSM_SINGLE_LINE = 7
+PSM_SINGLE_WORD = 8
+PSM_SINGLE_CHAR = 10
+
+
+class OcrResult(NamedTuple):
+    """The characters (without whitespace) read from an image."""
+
+    text: str
+    # the confidence (0.0 to 1.0) in each character of the text
+    confidences: Tuple[float, ...]
+
+    @property
+    def confidence(self) -> float:
+        """Return the confidence in the least certain character (0.0 if none)."""
+        return min(self.confidences, default=0.0)
+
+
+class OcrEngine:
+    """Base class for ocr engines."""
+
+    name = ""
+
+    def image_to_text(self, image: numpy.ndarray, single_char=False) -> str:
+        """Return the text found in a binarised image."""
+        raise NotImplementedError
+
+    def image_to_chars(self, image: numpy.ndarray, whitelist="") -> List[Character]:
+        """Return the characters found on a single line of a binarised image."""
+        raise NotImplementedError
+
+    def image_to_result(
+        self, image: numpy.ndarray, psm=PSM_SINGLE_CHAR, whitelist=""
+    ) -> OcrResult:
+        """Return the characters found in a binarised image with their confidence."""
+        raise NotImplementedError
+
+    def images_to_digits(self, images: Sequence[numpy.ndarray]) -> List[Optional[int]]:
+        """
+        Return the digit in each binarised image which can be read in one batch.
+
+        Images which could not be read are returned as None, and are left to be
+        recognised individually. By default nothing is read in a batch.
+        """
+        return [None] * len(images)
+
+
+class TesseractCliEngine(OcrEngine):
+    """
+    Run tesseract in a subprocess via pytesseract.
+
+    This works wherever the tesseract binary is installed, but pays for a
+    process launch on every call.
+    """
+
+    name = "tesseract-cli"
+
+    def __init__(self):
+        """Probe the installed tesseract version once."""
+        version = pytesseract.get_tesseract_version().version[0]
+        self.psm_flag = "-psm" if version < 4 else "--psm"
+
+    def _config(self, psm: Optional[int], whitelist="") -> str:
+        config = f"{self.psm_flag} {psm}" if psm is not None else ""
+        if whitelist:
+            config = f"{config} -c tessedit_char_whitelist={whitelist}"
+        return config.strip()
+
+    def image_to_text(self, image: numpy.ndarray, single_char=False) -> str:
+        """Return the text found in a binarised image."""
+        # configure tesseract to expect a single character
+        config = self._config(PSM_SINGLE_CHAR if single_char else None)
+        return pytesseract.image_to_string(image, config=config)
+
+    def image_to_chars(self, image: numpy.ndarray, whitelist="") -> List[Character]:
+        """Return the characters found on a single line of a binarised image."""
+        data = pytesseract.image_to_boxes(
+            image,
+            config=self._config(PSM_SINGLE_LINE, whitelist),
+            output_type=pytesseract.Output.DICT,
+        )
+        return [
+            (char, left, right - left)
+            for char, left, right in zip(data["char"], data["left"], data["right"])
+        ]
+
+    def image_to_result(
+        self, image: numpy.ndarray, psm=PSM_SINGLE_CHAR, whitelist=""
+    ) -> OcrResult:
+        """
+        Return the characters found in a binarised image with their confidence.
+
+        Tesseract only reports the confidence of whole words, so each character
+        has the confidence of its word.
+        """
+        data = pytesseract.image_to_data(
+            image,
+            config=self._config(psm, whitelist),
+            output_type=pytesseract.Output.DICT,
+        )
+        text, confidences = "", []
+        for word, confidence in zip(data["text"], data["conf"]):
+            word = "".join(word.split())
+            # rows without text (blocks, lines etc.) have a confidence of -1
+            if word and float(confidence) >= 0:
+                text += word
+                confidences += [float(confidence) / 100] * len(word)
+        return OcrResult(text, tuple(confidences))
+
+    def images_to_digits(self, images: Sequence[numpy.ndarray]) -> List[Optional[int]]:
+        """Return the digit in each binarised image by reading a montage of them."""
+        if len(images) < 2:
+            return super().images_to_digits(images)
+        return montage_to_digits(self, build_montage(images), len(images))
+
+
+class TesserocrEngine(OcrEngine):
+    """
+    Run libtesseract in process via the tesserocr binding.
+
+    Creating a tesseract api handle is expensive (it loads the language data) so
+    each thread keeps its own handle and reuses it for every call.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        """Ensure the binding is available and can load its language data."""
+        if tesserocr is None:
+            raise RuntimeError("tesserocr (the tesserocr extra) is not installed.")
+        self._local = threading.local()
+        self.api  # pylint: disable=pointless-statement
+
+    @property
+    def api(self) -> "tesserocr.PyTessBaseAPI":
+        """Return this thread's tesseract api handle."""
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._local.api = tesserocr.PyTessBaseAPI()
+        return api
+
+    def _set_image(self, image: numpy.ndarray, psm: int, whitelist=""):
+        api = self.api
+        api.SetPageSegMode(psm)
+        api.SetVariable("tessedit_char_whitelist", whitelist)
+        image = numpy.ascontiguousarray(image)
+        height, width = image.shape
+        api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        return api
+
+    def image_to_text(self, image: numpy.ndarray, single_char=False) -> str:
+        """Return the text found in a binarised image."""
+        psm = tesserocr.PSM.SINGLE_CHAR if single_char else tesserocr.PSM.AUTO
+        return self._set_image(image, psm).GetUTF8Text()
+
+    def image_to_chars(self, image: numpy.ndarray, whitelist="") -> List[Character]:
+        """Return the characters found on a single line of a binarised image."""
+        api = self._set_image(image, tesserocr.PSM.SINGLE_LINE, whitelist)
+        api.Recognize()
+        chars = []
+        level = tesserocr.RIL.SYMBOL
+        for result in tesserocr.iterate_level(api.GetIterator(), level):
+            box = result.BoundingBox(level)
+            if box is not None:
+                chars.append((result.GetUTF8Text(level), box[0], box[2] - box[0]))
+        return chars
+
+    def image_to_result(
+        self, image: numpy.ndarray, psm=PSM_SINGLE_CHAR, whitelist=""
+    ) -> OcrResult:
+        """Return the characters found in a binarised image with their confidence."""
+        api = self._set_image(image, psm, whitelist)
+        api.Recognize()
+        text, confidences = "", []
+        level = tesserocr.RIL.SYMBOL
+        for result in tesserocr.iterate_level(api.GetIterator(), level):
+            try:
+                char = "".join(result.GetUTF8Text(level).split())
+            except RuntimeError:
+                # raised when tesseract found nothing in the image
+                continue
+            if char:
+                text += char
+                confidences.append(result.Confidence(level) / 100)
+        return OcrResult(text, tuple(confidences))
+
+
+class TemplateEngine(OcrEngine):
+    """
+    Classify single digits against templates of ING's keypad digits.
+
+    This needs neither tesseract nor any language data. Anything which is not a
+    confidently matched single digit is passed to the fallback engine.
+    """
+
+    name = "templates"
+    # the lowest correlation accepted as a match, distinct ING digits correlate
+    # at no more than ~0.8 while rescaled copies of a digit stay above ~0.95
+    threshold = 0.9
+
+    def __init__(self, fallback: Optional[OcrEngine] = None):
+        """Load the templates and set the engine used for anything else."""
+        self.classifier = get_digit_classifier()
+        self.fallback = fallback
+
+    def _get_fallback(self) -> OcrEngine:
+        if self.fallback is None:
+            raise RuntimeError("No tesseract engine is available.")
+        return self.fallback
+
+    def image_to_text(self, image: numpy.ndarray, single_char=False) -> str:
+        """Return the text found in a binarised image."""
+        if single_char:
+            digit = self.images_to_digits([image])[0]
+            if digit is not None:
+                return str(digit)
+        return self._get_fallback().image_to_text(image, single_char=single_char)
+
+    def image_to_chars(self, image: numpy.ndarray, whitelist="") -> List[Character]:
+        """Return the characters found on a single line of a binarised image."""
+        return self._get_fallback().image_to_chars(image, whitelist=whitelist)
+
+    def image_to_result(
+        self, image: numpy.ndarray, psm=PSM_SINGLE_CHAR, whitelist=""
+    ) -> OcrResult:
+        """
+        Return the characters found in a binarised image with their confidence.
+
+        A single character is scored by its correlation with the best matching
+        template. Anything else, or a character which does not confidently
+        match, is passed to the fallback engine if there is one.
+        """
+        labels, scores = self.classifier.classify([image])
+        score = float(scores[0])
+        if self.fallback is None or (
+            psm == PSM_SINGLE_CHAR and score >= self.threshold
+        ):
+            return OcrResult(labels[0], (max(score, 0.0),))
+        return self.fallback.image_to_result(image, psm=psm, whitelist=whitelist)
+
+    def images_to_digits(self, images: Sequence[numpy.ndarray]) -> List[Optional[int]]:
+        """Return the digit in each binarised image which matches a template."""
+        labels, scores = self.classifier.classify(images)
+        digits = [
+            int(label) if score >= self.threshold else None
+            for label, score in zip(labels, scores)
+        ]
+        missing = [index for index, digit in enumerate(digits) if digit is None]
+        if missing and self.fallback is not None:
+            batch = self.fallback.images_to_digits([images[i] for i in missing])
+            for index, digit in zip(missing, batch):
+                digits[index] = digit
+        return digits
+
+
+# tesseract backed engines in order of preference
+ENGINE_CLASSES = [TesserocrEngine, TesseractCliEngine]
+
+_engine_lock = threading.Lock()
+_engine: Optional[OcrEngine] = None
+
+
+def get_engine() -> OcrEngine:
+    """
+    Return the fastest engine available in this environment.
+
+    Digits are classified against templates, falling back to the fastest
+    tesseract engine available. The tesseract engines are probed once per
+    process and the chosen engine is reused.
+    """
+    global _engine  # pylint: disable=global-statement
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TemplateEngine(_probe_engines())
+    return _engine
+
+
+def set_engine(engine: Optional[OcrEngine]):
+    """Set the engine to be used (None to probe for one again)."""
+    global _engine  # pylint: disable=global-statement
+    _engine = engine
+
+
+def _probe_engines() -> Optional[OcrEngine]:
+    for engine_class in ENGINE_CLASSES:
+        try:
+            return engine_class()
+        except Exception as error:  # pylint: disable=broad-except
+            logger.info(
+                "The %s ocr engine is unavailable: %s", engine_class.name, error
+            )
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine_by_name(name: str) -> OcrEngine:
+    """Return the engine with the given name."""
+    if name == TemplateEngine.name:
+        return TemplateEngine(_probe_engines())
+    for engine_class in ENGINE_CLASSES:
+        if engine_class.name == name:
+            return engine_class()
+    raise ValueError(f'Unknown ocr engine: "{name}"')
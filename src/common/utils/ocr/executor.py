@@ -0,0 +1,95 @@
+"""
+Run ocr in a pool of worker processes.
+
+Recognition is CPU bound, so running it in the calling thread serialises every
+keypad behind the GIL. The pool's workers are started with the ocr engine
+already loaded, so submitted images only pay for the recognition itself.
+"""
+import math
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+
+from common.utils import ocr
+from common.utils.ocr.engines import get_engine
+
+_executor_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _initialise_worker():
+    """Load the ocr engine before the worker accepts any images."""
+    get_engine()
+
+
+def get_max_workers() -> int:
+    """Return the size of the pool (`OCR_MAX_WORKERS`, default: one per core)."""
+    max_workers = None
+    if settings.configured:
+        max_workers = getattr(settings, "OCR_MAX_WORKERS", None)
+    return max_workers or os.cpu_count() or 1
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the process wide ocr executor, starting it if necessary."""
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=get_max_workers(), initializer=_initialise_worker
+                )
+    return _executor
+
+
+def shutdown_executor(wait=True):
+    """Stop the process wide ocr executor (it is restarted when next used)."""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def submit_b64_image_to_int(b64_image: str) -> "Future[int]":
+    """Return a future of the digit shown in a base64 encoded image."""
+    return get_executor().submit(ocr.b64_image_to_int, b64_image)
+
+
+def submit_b64_images_to_ints(b64_images: Sequence[str]) -> "Future[List[int]]":
+    """Return a future of the digit shown in each base64 encoded image."""
+    return get_executor().submit(ocr.b64_images_to_ints, list(b64_images))
+
+
+def map_b64_images_to_ints(b64_images: Sequence[str]) -> List[int]:
+    """
+    Return the digit shown in each base64 encoded image, in order.
+
+    The images are split into one batch per worker which are recognised in
+    parallel.
+
+    Raises ValueError if any image does not contain an integer.
+    """
+    if not b64_images:
+        return []
+    size = math.ceil(len(b64_images) / get_max_workers())
+    futures = [
+        submit_b64_images_to_ints(b64_images[start : start + size])
+        for start in range(0, len(b64_images), size)
+    ]
+    return [digit for future in futures for digit in future.result()]
+
+
+def map_keypads_to_ints(keypads: Sequence[Sequence[str]]) -> List[List[int]]:
+    """
+    Return the digits shown on each keypad (a list of base64 encoded images).
+
+    Each keypad is recognised by a worker of its own.
+
+    Raises ValueError if any image does not contain an integer.
+    """
+    futures = [submit_b64_images_to_ints(keypad) for keypad in keypads]
+    return [future.result() for future in futures]
@@ -0,0 +1,62 @@
+"""
+Tile many binarised images into one so they can be recognised in one pass.
+
+This is worthwhile for engines with a large fixed cost per call, such as
+launching a tesseract subprocess.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy
+
+# blank space (in pixels) left around each digit when tiling a montage, this
+# needs to be wide enough that tesseract does not merge neighbouring digits
+MONTAGE_PADDING = 24
+
+
+def crop_to_content(image: numpy.ndarray) -> numpy.ndarray:
+    """Return the smallest region of a binarised image containing all the ink."""
+    rows, cols = numpy.nonzero(image == 0)
+    if not rows.size:
+        return image
+    return image[rows.min() : rows.max() + 1, cols.min() : cols.max() + 1]
+
+
+def build_montage(images: Sequence[numpy.ndarray]) -> numpy.ndarray:
+    """
+    Tile binarised images left to right onto one white canvas.
+
+    Every tile is cropped to its content and placed in an equally sized cell, so
+    the cell containing any point of the montage is `x // cell_width`.
+    """
+    crops = [crop_to_content(image) for image in images]
+    cell_height = max(crop.shape[0] for crop in crops) + 2 * MONTAGE_PADDING
+    cell_width = max(crop.shape[1] for crop in crops) + 2 * MONTAGE_PADDING
+    montage = numpy.full((cell_height, cell_width * len(crops)), 255, numpy.uint8)
+    for index, crop in enumerate(crops):
+        top = (cell_height - crop.shape[0]) // 2
+        left = index * cell_width + (cell_width - crop.shape[1]) // 2
+        montage[top : top + crop.shape[0], left : left + crop.shape[1]] = crop
+    return montage
+
+
+def montage_to_digits(
+    engine, montage: numpy.ndarray, count: int
+) -> List[Optional[int]]:
+    """
+    Return the digit found in each cell of a montage from a single engine call.
+
+    Cells where the engine did not find exactly one digit are returned as None.
+    """
+    cell_width = montage.shape[1] // count
+    chars = engine.image_to_chars(montage, whitelist="0123456789")
+    found: Dict[int, List[str]] = {}
+    for char, left, width in chars:
+        char = char.strip()
+        if char:
+            found.setdefault((left + width // 2) // cell_width, []).append(char)
+    digits: List[Optional[int]] = []
+    for cell in range(count):
+        cell_chars = found.get(cell, [])
+        is_digit = len(cell_chars) == 1 and cell_chars[0].isdigit()
+        digits.append(int(cell_chars[0]) if is_digit else None)
+    return digits
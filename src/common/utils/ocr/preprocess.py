@@ -0,0 +1,70 @@
+"""
+Prepare images for the ocr engines.
+
+Engines expect binarised images: black text on a white background. Keypad
+images are decoded straight to greyscale and thresholded and inverted in a
+single step, so each image needs only the one array allocated by its decoding.
+Batches of same sized images are thresholded into one preallocated stack.
+"""
+import base64
+from typing import List, Optional, Sequence, Union
+
+import cv2
+import numpy
+
+# binarise (convert to black or white) and invert (the text is white in the
+# original images) in a single pass
+THRESHOLD_TYPE = cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU
+
+
+def binarise(image: numpy.ndarray) -> numpy.ndarray:
+    """Return the (BGR) image as black text on a white background."""
+    # convert image to greyscale
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return binarise_grey(image, dst=image)
+
+
+def binarise_grey(
+    image: numpy.ndarray, dst: Optional[numpy.ndarray] = None
+) -> numpy.ndarray:
+    """
+    Return the greyscale image as black text on a white background.
+
+    The result is written to `dst` when given, which may be the image itself.
+    """
+    return cv2.threshold(image, thresh=0, maxval=255, type=THRESHOLD_TYPE, dst=dst)[1]
+
+
+def b64_to_image(b64_image: str) -> numpy.ndarray:
+    """Return the decoded (BGR) image of a base64 encoded string."""
+    numpy_array = numpy.frombuffer(base64.b64decode(b64_image), dtype=numpy.uint8)
+    return cv2.imdecode(numpy_array, flags=cv2.IMREAD_COLOR)
+
+
+def b64_to_grey(b64_image: str) -> numpy.ndarray:
+    """Return the decoded greyscale image of a base64 encoded string."""
+    numpy_array = numpy.frombuffer(base64.b64decode(b64_image), dtype=numpy.uint8)
+    return cv2.imdecode(numpy_array, flags=cv2.IMREAD_GRAYSCALE)
+
+
+def b64_images_to_binarised(
+    b64_images: Sequence[str], out: Optional[numpy.ndarray] = None
+) -> Union[numpy.ndarray, List[numpy.ndarray]]:
+    """
+    Return base64 encoded images binarised, ready for the ocr engines.
+
+    When every image is the same size they are returned as one (N, H, W) stack,
+    which is written to `out` if it is given and has that shape (e.g. to reuse
+    the stack from a previous batch). Otherwise each image is binarised in
+    place and they are returned as a list.
+    """
+    greys = [b64_to_grey(b64_image) for b64_image in b64_images]
+    shapes = {grey.shape for grey in greys}
+    if len(shapes) != 1:
+        return [binarise_grey(grey, dst=grey) for grey in greys]
+    shape = (len(greys), *shapes.pop())
+    if out is None or out.shape != shape or out.dtype != numpy.uint8:
+        out = numpy.empty(shape, numpy.uint8)
+    for grey, dst in zip(greys, out):
+        binarise_grey(grey, dst=dst)
+    return out
@@ -0,0 +1,91 @@
+"""
+Read single digits, escalating to slower strategies only when unsure.
+
+Most tiles are read confidently by the first (and cheapest) strategy. Only
+tiles read with low confidence are tried again in other ways, such as a
+different page segmentation mode, upscaled or with their colours inverted,
+and the chain stops at the first confident reading. The chain is finite and
+can be given a time budget, so the cost of a bad tile is bounded.
+"""
+import time
+from typing import Callable, NamedTuple, Optional, Sequence
+
+import cv2
+import numpy
+
+from common.utils.ocr.engines import (
+    PSM_SINGLE_CHAR,
+    PSM_SINGLE_WORD,
+    OcrEngine,
+    OcrResult,
+)
+
+DIGITS = "0123456789"
+# the confidence at which a reading is accepted without trying other strategies
+MIN_CONFIDENCE = 0.9
+
+
+class Strategy(NamedTuple):
+    """A way of reading a binarised image."""
+
+    name: str
+    psm: int
+    # applied to the binarised image before it is read
+    transform: Optional[Callable[[numpy.ndarray], numpy.ndarray]] = None
+
+
+def upscale(image: numpy.ndarray) -> numpy.ndarray:
+    """Return a binarised image at twice the size, with smoothed edges."""
+    image = cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    return cv2.threshold(image, 127, 255, cv2.THRESH_BINARY)[1]
+
+
+def invert(image: numpy.ndarray) -> numpy.ndarray:
+    """Return a binarised image with its colours swapped."""
+    return cv2.bitwise_not(image)
+
+
+# strategies for reading a single digit, cheapest first
+DIGIT_STRATEGIES = [
+    Strategy("char", PSM_SINGLE_CHAR),
+    Strategy("word", PSM_SINGLE_WORD),
+    Strategy("upscaled", PSM_SINGLE_CHAR, upscale),
+    Strategy("inverted", PSM_SINGLE_CHAR, invert),
+]
+
+
+def is_digit(result: OcrResult) -> bool:
+    """Return whether the result is exactly one digit."""
+    return len(result.text) == 1 and result.text in DIGITS
+
+
+def read_digit(
+    engine: OcrEngine,
+    image: numpy.ndarray,
+    strategies: Sequence[Strategy] = DIGIT_STRATEGIES,
+    min_confidence: float = MIN_CONFIDENCE,
+    budget: Optional[float] = None,
+) -> OcrResult:
+    """
+    Return the most confident reading of the single digit in a binarised image.
+
+    The strategies are tried in order until one reads a digit with at least
+    `min_confidence`. No further strategies are started once `budget` seconds
+    have passed. If no strategy was confident the most confident digit read is
+    returned, or if no digit was read at all the most confident reading.
+    """
+    start = time.perf_counter()
+    best: Optional[OcrResult] = None
+    for strategy in strategies:
+        prepared = image if strategy.transform is None else strategy.transform(image)
+        result = engine.image_to_result(prepared, psm=strategy.psm, whitelist=DIGITS)
+        if is_digit(result) and result.confidence >= min_confidence:
+            return result
+        if best is None or (is_digit(result), result.confidence) > (
+            is_digit(best),
+            best.confidence,
+        ):
+            best = result
+        if budget is not None and time.perf_counter() - start >= budget:
+            break
+    return best if best is not None else OcrResult("", ())
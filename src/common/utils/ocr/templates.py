@@ -0,0 +1,107 @@
+"""
+Classify single digits by correlating them against labelled templates.
+
+Every glyph is cropped to its content, scaled (keeping its aspect ratio) to
+fit a fixed size square, blurred slightly so that a pixel of difference at its
+edges barely matters, and normalised to zero mean and unit length. The dot
+product of two glyphs is then their normalised correlation (1.0 for identical
+glyphs), and a whole batch of glyphs is scored against every template with a
+single matrix multiplication.
+
+A template is the (normalised) mean of many examples of its glyph, so that it
+matches the variation between them rather than any one image. The digit
+templates are built (see the build_digit_templates command) from a corpus of
+jittered copies of ING's tiles, and stored as an npz file holding a (N,)
+`labels` array and an (N, TEMPLATE_SIZE ** 2) float32 `templates` array.
+"""
+import functools
+import os
+from typing import List, Sequence, Tuple
+
+import cv2
+import numpy
+
+from common.utils.ocr.montage import crop_to_content
+
+DIGIT_TEMPLATES_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "digit_templates.npz"
+)
+# side length (in pixels) of the square glyphs are scaled to fit
+TEMPLATE_SIZE = 32
+# standard deviation (in pixels) of the blur applied to scaled glyphs
+TEMPLATE_BLUR = 1.0
+
+
+def normalise(images: Sequence[numpy.ndarray]) -> numpy.ndarray:
+    """Return binarised images as rows of zero mean, unit length vectors."""
+    glyphs = numpy.zeros((len(images), TEMPLATE_SIZE, TEMPLATE_SIZE), numpy.float32)
+    for canvas, image in zip(glyphs, images):
+        # ink is black, so flip the values so that the ink carries the weight
+        glyph = 255 - crop_to_content(image)
+        scale = TEMPLATE_SIZE / max(glyph.shape)
+        height = max(1, round(glyph.shape[0] * scale))
+        width = max(1, round(glyph.shape[1] * scale))
+        top = (TEMPLATE_SIZE - height) // 2
+        left = (TEMPLATE_SIZE - width) // 2
+        canvas[top : top + height, left : left + width] = cv2.resize(
+            glyph, (width, height), interpolation=cv2.INTER_AREA
+        )
+        cv2.GaussianBlur(canvas, (0, 0), TEMPLATE_BLUR, dst=canvas)
+    glyphs = glyphs.reshape(len(images), -1)
+    glyphs -= glyphs.mean(axis=1, keepdims=True)
+    norms = numpy.linalg.norm(glyphs, axis=1, keepdims=True)
+    # blank images have no variance, leave them as zeros (i.e. no correlation)
+    numpy.divide(glyphs, norms, out=glyphs, where=norms > 0)
+    return glyphs
+
+
+class TemplateClassifier:
+    """Classify binarised glyphs as the label of their best matching template."""
+
+    def __init__(self, labels: Sequence[str], templates: numpy.ndarray):
+        """Set the label of each (normalised) template."""
+        self.labels = list(labels)
+        self.templates = templates
+
+    @classmethod
+    def from_images(
+        cls, labels: Sequence[str], images: Sequence[numpy.ndarray]
+    ) -> "TemplateClassifier":
+        """Return a classifier with the mean of the binarised images of each label."""
+        glyphs = normalise(images)
+        labels = numpy.asarray(labels)
+        unique = sorted(set(map(str, labels)))
+        templates = numpy.stack(
+            [glyphs[labels == label].mean(axis=0) for label in unique]
+        )
+        templates /= numpy.linalg.norm(templates, axis=1, keepdims=True)
+        return cls(unique, templates)
+
+    @classmethod
+    def load(cls, path: str) -> "TemplateClassifier":
+        """Return the classifier saved at `path`."""
+        with numpy.load(path) as stored:
+            return cls([str(label) for label in stored["labels"]], stored["templates"])
+
+    def save(self, path: str):
+        """Save the labels and templates as an npz file."""
+        numpy.savez(path, labels=numpy.asarray(self.labels), templates=self.templates)
+
+    def classify(
+        self, images: Sequence[numpy.ndarray]
+    ) -> Tuple[List[str], numpy.ndarray]:
+        """Return the best label and its score (-1.0 to 1.0) for each image."""
+        if not images:
+            return [], numpy.empty(0, numpy.float32)
+        scores = normalise(images) @ self.templates.T
+        best = scores.argmax(axis=1)
+        return (
+            [self.labels[index] for index in best],
+            scores[numpy.arange(len(best)), best],
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_digit_classifier() -> TemplateClassifier:
+    """Return a classifier for the digits shown on ING's keypad."""
+    return TemplateClassifier.load(DIGIT_TEMPLATES_PATH)
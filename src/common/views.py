@@ -0,0 +1,52 @@
+"""Project-wide view classes."""
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework import mixins
+
+from common.renderers import JSONRenderer
+
+# values of the stream query parameter which ask for the list to be streamed
+STREAM_VALUES = ["1", "true"]
+
+
+class StreamingListModelMixin(mixins.ListModelMixin):
+    """
+    List a queryset, or stream all of it when asked with `page[stream]=true`.
+
+    Streamed lists are not paginated. The queryset is read from the database
+    in chunks (without prefetching related objects) and each chunk is rendered
+    and sent before the next is read, so memory use is constant however many
+    results there are and the first bytes are sent straight away.
+    """
+
+    stream_query_param = "page[stream]"
+    stream_chunk_size = 2000
+
+    def is_streaming(self) -> bool:
+        """Return whether the list should be streamed."""
+        value = self.request.query_params.get(self.stream_query_param, "")
+        return value.lower() in STREAM_VALUES and isinstance(
+            self.request.accepted_renderer, JSONRenderer
+        )
+
+    def get_stream_pages(self, queryset):
+        """Yield the serializer data of each chunk of the queryset."""
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                return
+            yield self.get_serializer(chunk, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        """Stream the list if asked to, otherwise list it as usual."""
+        if not self.is_streaming():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        content = request.accepted_renderer.render_stream(
+            self.get_stream_pages(queryset),
+            request.accepted_media_type,
+            self.get_renderer_context(),
+        )
+        return StreamingHttpResponse(content, content_type=request.accepted_media_type)
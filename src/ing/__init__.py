@@ -0,0 +1 @@
+"""Client for ING's api."""
@@ -0,0 +1,13 @@
+"""Admin of the ing app."""
+from django.contrib import admin
+
+from ing.models import IngAccount
+
+
+@admin.register(IngAccount)
+class IngAccountAdmin(admin.ModelAdmin):
+    """The admin interface recording which clients each user owns."""
+
+    list_display = ["cif", "user", "created"]
+    search_fields = ["cif", "user__email"]
+    raw_id_fields = ["user"]
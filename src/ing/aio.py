@@ -0,0 +1,140 @@
+"""
+Asyncio client for ING's api, for logging in many accounts from one process.
+
+The client has the same surface as `IngApi` but never blocks the event loop.
+Http requests (through the pooled transport) and RSA work run in a thread
+executor, and ocr runs in the ocr process pool. A login only ever waits on one
+thread at a time, so the logins running at once are bounded by the size of the
+thread executor: `login_many` runs them in one of its own, sized to match.
+"""
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import requests
+
+from ing.api import IngApi
+from ing.keys import KeyPool, get_key_pool
+from ing.pins import PinProvider, pin_to_key_positions
+from ing.tokens import Token, TokenStore
+from ing.transport import Transport, get_transport
+
+# the most logins `login_many` runs at once by default
+MAX_CONCURRENT_LOGINS = 32
+
+
+class AsyncIngApi:
+    """Asyncio client for interacting with ING's api."""
+
+    # the synchronous client whose blocking calls are run in the executor
+    api_class = IngApi
+
+    def __init__(
+        self,
+        cif: str,
+        key_pool: Optional[KeyPool] = None,
+        transport: Optional[Transport] = None,
+        executor: Optional[Executor] = None,
+        pin_provider: Optional[PinProvider] = None,
+        base_url: Optional[str] = None,
+    ):
+        """
+        Initialise the client, a key is taken from the pool when first needed.
+
+        Blocking calls run in `executor`, by default the event loop's.
+        """
+        self.cif = cif
+        self.key_pool = key_pool or get_key_pool()
+        self.transport = transport or get_transport()
+        self.executor = executor
+        self.pin_provider = pin_provider
+        self.base_url = base_url
+        self._api: Optional[IngApi] = None
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def get_api(self) -> IngApi:
+        """Return the synchronous client holding this client's state."""
+        if self._api is None:
+            self._api = await self._run(
+                self.api_class,
+                self.cif,
+                key_pool=self.key_pool,
+                transport=self.transport,
+                pin_provider=self.pin_provider,
+                base_url=self.base_url,
+            )
+        return self._api
+
+    async def init_login_request(self):
+        """Get the keyboard mapping from ING."""
+        await self._run((await self.get_api()).init_login_request)
+
+    async def get_signature(self, body=None) -> str:
+        """Sign request."""
+        return await self._run((await self.get_api()).get_signature, body)
+
+    async def get_keypad_digits(self) -> List[int]:
+        """Return the digit shown on each of the keypad's images."""
+        return await (await self.get_api()).keypad.adigits()
+
+    async def get_encrypted_pin(self) -> str:
+        """Get the encrypted pin."""
+        api = await self.get_api()
+        if self.pin_provider is None:
+            return await self._run(api.get_encrypted_pin)
+        pin = await self._run(self.pin_provider.get_pin, self.cif)
+        key_positions = pin_to_key_positions(pin, await self.get_keypad_digits())
+        return await self._run(api.encrypt_key_positions, key_positions)
+
+    async def issue_token(self, encrypted_pin: str) -> requests.Response:
+        """Request an auth token with the pin (the second step of logging in)."""
+        return await self._run((await self.get_api()).issue_token, encrypted_pin)
+
+    async def get_token(self, token_store: Optional[TokenStore] = None) -> Token:
+        """Return a token for the client, logging in only if there is no fresh one."""
+        return await self._run((await self.get_api()).get_token, token_store)
+
+    async def login(self) -> requests.Response:
+        """Log into ING."""
+        await self.init_login_request()
+        return await self.issue_token(await self.get_encrypted_pin())
+
+
+async def login_many(
+    clients: Sequence[AsyncIngApi], max_concurrency: int = MAX_CONCURRENT_LOGINS
+) -> List[Union[requests.Response, Exception]]:
+    """
+    Log every client in, running at most `max_concurrency` logins at once.
+
+    Clients without an executor of their own run their blocking calls in one
+    with a thread for each login which may run at once. The result of each
+    login is returned in order, with failed logins returning their exception
+    rather than cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="ing-login"
+    )
+
+    async def login(client: AsyncIngApi) -> requests.Response:
+        async with semaphore:
+            if client.executor is not None:
+                return await client.login()
+            client.executor = executor
+            try:
+                return await client.login()
+            finally:
+                client.executor = None
+
+    try:
+        return await asyncio.gather(
+            *[login(client) for client in clients], return_exceptions=True
+        )
+    finally:
+        executor.shutdown(wait=False)
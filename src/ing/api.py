@@ -0,0 +1,191 @@
+"""Client for ING's api."""
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+from Crypto.Cipher import PKCS1_v1_5 as cipher_method
+from Crypto.Hash import SHA
+from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
+from django.conf import settings
+
+from ing.keypad import Keypad
+from ing.keys import KeyPool, get_key_pool
+from ing.pins import PinProvider, pin_to_key_positions
+from ing.ratelimit import Priority
+from ing.tokens import Token, TokenStore, get_token_store
+from ing.transport import Transport, get_transport
+
+BASE_URL = "https://www.ing.com.au"
+KEYPAD_PATH = "/KeypadService/v1/KeypadService.svc/json/PinpadImages"
+ISSUE_PATH = "/STSServiceB2C/V1/SecurityTokenServiceProxy.svc/issue"
+# the start of every signed message, followed by the token and the body
+SIGNATURE_PREFIX = b"X-AuthToken:"
+
+
+def get_base_url() -> str:
+    """Return the url of ING's api (`ING_BASE_URL` when django is configured)."""
+    base_url = None
+    if settings.configured:
+        base_url = getattr(settings, "ING_BASE_URL", None)
+    return base_url or BASE_URL
+
+
+def encode_body(body: Any) -> bytes:
+    """Return the bytes a json body is both signed as and sent as."""
+    return json.dumps(body).encode("utf-8")
+
+
+class IngApi:
+    """Class for interacting with ING's api."""
+
+    def __init__(
+        self,
+        cif: str,
+        key_pool: Optional[KeyPool] = None,
+        transport: Optional[Transport] = None,
+        pin_provider: Optional[PinProvider] = None,
+        base_url: Optional[str] = None,
+        key: Optional[RSA.RsaKey] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        """
+        Initialise the various instance variables, taking a key from the pool.
+
+        A key may be given instead (e.g. to share one between many clients).
+        Without a pin provider the pin's keypad positions are entered manually.
+        Requests are scheduled with the priority when ING's rates are limited.
+        """
+        self.cif = cif
+        self.base_url = (base_url or get_base_url()).rstrip("/")
+        self.transport = transport or get_transport()
+        self.pin_provider = pin_provider
+        self.priority = priority
+        self.key = key or (key_pool or get_key_pool()).get()
+        self.public_modulus = hex(self.key.n)[2:]
+        self.signer = PKCS1_v1_5.new(self.key)
+        # (token, digest of the prefix and token) to start each signature from
+        self._token_digest: Optional[Tuple[Optional[str], SHA.SHA1Hash]] = None
+        self.token = None
+        self.b64images = None
+        self.keypad: Optional[Keypad] = None
+        self.secret = None
+        self.server_key = None
+
+    def init_login_request(self):
+        """Get the keyboard mapping from ING."""
+        response = self.transport.get(
+            f"{self.base_url}{KEYPAD_PATH}", priority=self.priority
+        )
+        json_response = response.json()
+        self.b64images = json_response["KeypadImages"]
+        self.keypad = Keypad(self.b64images)
+        self.secret = json_response["Secret"]
+        self.server_key = RSA.importKey(json_response["PemEncryptionKey"])
+
+    def get_signature(self, body=None):
+        """Sign request."""
+        return self.sign_body(body)[1]
+
+    def sign_body(self, body: Any = None) -> Tuple[Optional[bytes], str]:
+        """
+        Return the encoded body and its signature.
+
+        The body is only encoded once, send the returned bytes so that what is
+        sent is exactly what was signed.
+        """
+        data = None if body is None else encode_body(body)
+        return data, self.sign_bytes(data)
+
+    def sign_bytes(self, data: Optional[bytes] = None) -> str:
+        """Sign an encoded body (or no body) along with the current token."""
+        if self._token_digest is None or self._token_digest[0] != self.token:
+            digest = SHA.new(SIGNATURE_PREFIX)
+            if self.token:
+                digest.update(self.token.encode("utf-8"))
+            self._token_digest = (self.token, digest)
+        digest = self._token_digest[1].copy()
+        if data:
+            digest.update(data)
+        return self.signer.sign(digest).hex()
+
+    def signed_request(self, method: str, url: str, body: Any = None, **kwargs):
+        """Send a request with a json body, signed with the client's key."""
+        data, signature = self.sign_body(body)
+        headers = {
+            **kwargs.pop("headers", {}),
+            "X-AuthToken": self.token or "",
+            "X-AuthSignature": signature,
+        }
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+        kwargs.setdefault("priority", self.priority)
+        return self.transport.request(method, url, data=data, headers=headers, **kwargs)
+
+    def get_keypad_digits(self) -> List[int]:
+        """Return the digit shown on each of the keypad's images."""
+        return self.keypad.digits()
+
+    def show_keypad(self):
+        """Get and show keyboard image."""
+        self.keypad.show()
+
+    def get_key_positions(self) -> str:
+        """Return the keypad positions of the pin, comma separated."""
+        if self.pin_provider is None:
+            self.show_keypad()
+            return input("enter comma separated keypad positions: ")
+        pin = self.pin_provider.get_pin(self.cif)
+        return pin_to_key_positions(pin, self.get_keypad_digits())
+
+    def encrypt_key_positions(self, key_positions: str) -> str:
+        """Encrypt the pin's keypad positions with ING's key."""
+        cipher = cipher_method.new(self.server_key)
+        encrypted = cipher.encrypt(key_positions.encode("utf-8"))
+        return base64.b64encode(encrypted).decode("utf-8")
+
+    def get_encrypted_pin(self) -> str:
+        """Get the encrypted pin."""
+        return self.encrypt_key_positions(self.get_key_positions())
+
+    def login(self):
+        """Log into ING."""
+        self.init_login_request()
+        return self.issue_token(self.get_encrypted_pin())
+
+    def login_token(self) -> Token:
+        """Log into ING, returning the token issued."""
+        response = self.login()
+        response.raise_for_status()
+        return Token.from_response(response.json())
+
+    def get_token(
+        self, token_store: Optional[TokenStore] = None, owner: Optional[str] = None
+    ) -> Token:
+        """
+        Return a token for the client, logging in only if there is no fresh one.
+
+        Tokens are shared through the token store, by default the process wide
+        one, with callers for the same owner (if given).
+        """
+        token_store = token_store or get_token_store()
+        token = token_store.get_or_login(self.cif, self.login_token, owner)
+        self.token = token.value
+        return token
+
+    def issue_token(self, encrypted_pin: str):
+        """Request an auth token with the pin (the second step of logging in)."""
+        headers = {
+            "X-AuthPIN": encrypted_pin,
+            "X-AuthCIF": self.cif,
+            "X-MessageSignKey": self.public_modulus,
+            "X-AuthToken": "",
+            "X-AuthSecret": self.secret,
+            "X-AuthSignature": self.get_signature(),
+        }
+        return self.transport.post(
+            f"{self.base_url}{ISSUE_PATH}",
+            headers=headers,
+            json={},
+            priority=self.priority,
+        )
@@ -0,0 +1,8 @@
+"""Config for the ing application."""
+from django.apps import AppConfig
+
+
+class IngConfig(AppConfig):
+    """Config for the ing application."""
+
+    name = "ing"
@@ -0,0 +1,73 @@
+"""
+Log many clients in at once, timing every stage of each login.
+
+The logins run in a pool of threads sharing one RSA key, one pooled transport
+and the process' ocr engine, so only the first login pays to warm them up.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator
+
+from ing.api import IngApi
+from ing.keys import generate_rsa_key
+from ing.ratelimit import Priority
+
+# the stages of a login, in order
+STAGES = ["key", "keypad", "ocr", "pin", "issue"]
+
+
+def timed_login(cif: str, **options) -> Dict[str, Any]:
+    """
+    Log the client in headlessly, returning the result and each stage's timing.
+
+    The options are passed to `IngApi` and must include a pin provider. Errors
+    are returned in the result rather than raised.
+    """
+    result: Dict[str, Any] = {"cif": cif}
+    timings: Dict[str, float] = {}
+    start = last = time.perf_counter()
+
+    def finish(stage: str):
+        nonlocal last
+        now = time.perf_counter()
+        timings[stage] = round((now - last) * 1000, 3)
+        last = now
+
+    try:
+        api = IngApi(cif, **options)
+        finish("key")
+        api.init_login_request()
+        finish("keypad")
+        api.get_keypad_digits()
+        finish("ocr")
+        encrypted_pin = api.get_encrypted_pin()
+        finish("pin")
+        response = api.issue_token(encrypted_pin)
+        finish("issue")
+        result["status"] = response.status_code
+        result["response"] = response.json()
+    except Exception as error:  # pylint: disable=broad-except
+        result["error"] = f"{type(error).__name__}: {error}"
+    result["timings_ms"] = timings
+    result["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def login_batch(
+    cifs: Iterable[str], parallel: int = 8, **options
+) -> Iterator[Dict[str, Any]]:
+    """
+    Log every client in with at most `parallel` logins at once.
+
+    Results are yielded as each login finishes (see `timed_login`). Unless a
+    key is given in the options, one is generated for all the logins to share.
+    The logins are background work, yielding to interactive ones when ING's
+    rates are limited, unless another priority is given.
+    """
+    if "key" not in options:
+        options["key"] = generate_rsa_key()
+    options.setdefault("priority", Priority.BACKGROUND)
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [executor.submit(timed_login, cif, **options) for cif in cifs]
+        for future in as_completed(futures):
+            yield future.result()
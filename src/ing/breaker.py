@@ -0,0 +1,130 @@
+"""
+Circuit breakers failing calls to ING's services fast while they are unhealthy.
+
+Once a service has failed (not answered, or answered with a server error) too
+many times in a row its breaker opens, and calls to it fail immediately rather
+than each waiting for the full timeout and tying up a worker's thread. After a
+while one call is let through to probe the service, closing the breaker again
+if it succeeds.
+"""
+import enum
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+from ing.metrics import registry
+
+
+class State(enum.IntEnum):
+    """States of a breaker (exported as the value of its state metric)."""
+
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """A call was not made because the service's breaker is open."""
+
+
+class CircuitBreaker:
+    """Breaker of the calls to one service."""
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        """
+        Start closed.
+
+        The breaker opens after `failure_threshold` failures in a row, and lets
+        a probe through after it has been open for `reset_timeout` seconds.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = State.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        self._set_state(State.CLOSED)
+
+    def _set_state(self, state: State):
+        self.state = state
+        registry.gauge("ing_breaker_state", service=self.name).set(state)
+
+    def before(self):
+        """Raise CircuitOpenError unless a call may be made now."""
+        with self._lock:
+            if self.state == State.CLOSED:
+                return
+            # probe again should a probe never have reported back
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                self.opened_at = now
+                self._set_state(State.HALF_OPEN)
+                return
+        registry.counter("ing_breaker_rejections", service=self.name).inc()
+        raise CircuitOpenError(f"{self.name} is unavailable.")
+
+    def success(self):
+        """Record that a call succeeded."""
+        with self._lock:
+            self.failures = 0
+            if self.state != State.CLOSED:
+                self._set_state(State.CLOSED)
+
+    def failure(self):
+        """Record that a call failed, opening the breaker if need be."""
+        with self._lock:
+            self.failures += 1
+            if self.state == State.HALF_OPEN or (
+                self.state == State.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self._set_state(State.OPEN)
+                registry.counter("ing_breaker_opened", service=self.name).inc()
+
+
+class CircuitBreakers:
+    """A breaker for each service (host and first path segment) called."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Configure the breakers (see `CircuitBreaker`)."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        """Return the breaker of the service the url belongs to."""
+        parts = urlsplit(url)
+        service = parts.path.lstrip("/").split("/", 1)[0]
+        name = f"{parts.netloc}/{service}"
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    name, self.failure_threshold, self.reset_timeout
+                )
+        return breaker
+
+
+def get_circuit_breakers() -> Optional[CircuitBreakers]:
+    """
+    Return breakers configured by django's settings, or None if disabled.
+
+    Breakers open after `ING_BREAKER_FAILURES` failures in a row (0 to disable
+    them) and probe again after `ING_BREAKER_RESET_TIMEOUT` seconds.
+    """
+    if not settings.configured:
+        return None
+    failure_threshold = getattr(settings, "ING_BREAKER_FAILURES", 5)
+    if not failure_threshold:
+        return None
+    return CircuitBreakers(
+        failure_threshold, getattr(settings, "ING_BREAKER_RESET_TIMEOUT", 30.0)
+    )
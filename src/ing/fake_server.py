@@ -0,0 +1,279 @@
+"""
+Local stand-in for ING's api, for benchmarking and load testing offline.
+
+The server implements the two endpoints used to log in. `PinpadImages` returns
+a keypad of digit tiles in a random order with a real RSA key for encrypting
+the pin, and the STS `issue` endpoint checks the request's
+signature and the pin's keypad positions before issuing a token. Latency
+(with a slow tail) and errors can be injected to mimic production.
+
+Run it with `python -m ing.fake_server` from the src directory and point the
+client at it with `ING_BASE_URL` (or `login.py --base-url`).
+"""
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+from Crypto.Cipher import PKCS1_v1_5 as cipher_method
+from Crypto.Hash import SHA
+from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
+
+from common.utils.ocr.corpus import TileCorpusGenerator
+from ing.api import ISSUE_PATH, KEYPAD_PATH, SIGNATURE_PREFIX
+from ing.keys import generate_rsa_key
+
+# the number of differently rendered tiles served for each digit
+TILE_VARIANTS = 8
+# the furthest (x, y) in pixels a digit is moved from its place on ING's tile
+MAX_OFFSET = (20, 10)
+# the standard deviation of the noise added to each pixel of a tile
+NOISE = 4.0
+# the lifetime (in seconds) of the tokens issued
+TOKEN_TTL = 10 * 60
+# the most keypads awaiting a login, beyond which the oldest are forgotten
+MAX_KEYPADS = 10000
+
+
+class FakeIngServer(ThreadingHTTPServer):
+    """Threaded http server answering as ING's login endpoints would."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        pins: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Render the tiles and generate the server's key.
+
+        Every response is delayed by `latency` plus up to `jitter` seconds, a
+        `tail_rate` proportion of them by a further `tail_latency` seconds and
+        an `error_rate` proportion fail with a 503. Only the pins given (keyed
+        by cif) log in, or any pin if none are given.
+        """
+        super().__init__(address, FakeIngHandler)
+        self.pins = pins
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.verbose = False
+        self.key = generate_rsa_key()
+        self.public_pem = self.key.publickey().export_key().decode("ascii")
+        self.tiles = self.render_tiles(seed)
+        # the keypad (digit on each position) served with each unused secret,
+        # oldest first
+        self.keypads: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Return the url to use as the client's base url."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def render_tiles(seed: Optional[int]) -> List[List[str]]:
+        """
+        Return base64 encoded pngs of a few renderings of each digit.
+
+        Tiles are ING's own with the digit moved and noise added, so the client
+        reads them as it reads ING's.
+        """
+        generator = TileCorpusGenerator(
+            seed=seed, scale=(1.0, 1.0), max_offset=MAX_OFFSET, noise=NOISE
+        )
+        tiles: List[List[str]] = [[] for _ in range(10)]
+        for digit in range(10):
+            for _ in range(TILE_VARIANTS):
+                _, png = cv2.imencode(".png", generator.render(digit))
+                tiles[digit].append(base64.b64encode(png.tobytes()).decode("ascii"))
+        return tiles
+
+    def start(self) -> threading.Thread:
+        """Serve requests from a background thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Stop serving requests and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+    def delay(self):
+        """Wait as long as a response from ING might take."""
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            if self.random.random() < self.tail_rate:
+                delay += self.tail_latency
+        if delay:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        """Return whether to inject an error into this response."""
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def new_keypad(self) -> dict:
+        """Return a new keypad, remembering its order against its secret."""
+        secret = uuid.uuid4().hex
+        with self.lock:
+            digits = list(range(10))
+            self.random.shuffle(digits)
+            images = [self.random.choice(self.tiles[digit]) for digit in digits]
+            self.keypads[secret] = digits
+            while len(self.keypads) > MAX_KEYPADS:
+                self.keypads.popitem(last=False)
+        return {
+            "KeypadImages": images,
+            "Secret": secret,
+            "PemEncryptionKey": self.public_pem,
+        }
+
+    def issue(self, headers, body: bytes) -> Tuple[int, dict]:
+        """Return the status and body of a response to a login."""
+        with self.lock:
+            digits = self.keypads.pop(headers.get("X-AuthSecret", ""), None)
+        if digits is None:
+            return 401, {"ErrorMessage": "Unknown or reused secret."}
+        if not verify_signature(headers, body):
+            return 401, {"ErrorMessage": "Invalid signature."}
+        try:
+            encrypted = base64.b64decode(headers.get("X-AuthPIN", ""))
+            key_positions = cipher_method.new(self.key).decrypt(encrypted, None)
+            pin = "".join(
+                str(digits[int(position)])
+                for position in key_positions.decode("utf-8").split(",")
+            )
+        except (ValueError, IndexError, AttributeError):
+            return 401, {"ErrorMessage": "Invalid pin."}
+        cif = headers.get("X-AuthCIF", "")
+        if self.pins is not None and self.pins.get(cif) != pin:
+            return 401, {"ErrorMessage": "Incorrect pin."}
+        return 200, {"Token": uuid.uuid4().hex, "ExpiresIn": TOKEN_TTL}
+
+
+def verify_signature(headers, body: bytes) -> bool:
+    """Return whether a request was signed by the key it was sent with."""
+    try:
+        key = RSA.construct((int(headers.get("X-MessageSignKey", ""), 16), 65537))
+        signature = bytes.fromhex(headers.get("X-AuthSignature", ""))
+    except ValueError:
+        return False
+    message = SIGNATURE_PREFIX + headers.get("X-AuthToken", "").encode("utf-8")
+    verifier = PKCS1_v1_5.new(key)
+    # the body is optional in the signature (ING's issue endpoint excludes it)
+    return any(
+        verifier.verify(SHA.new(signed), signature)
+        for signed in [message, message + body]
+    )
+
+
+class FakeIngHandler(BaseHTTPRequestHandler):
+    """Handle a request to the fake server."""
+
+    protocol_version = "HTTP/1.1"
+    server: FakeIngServer
+
+    def send_json(self, status: int, data: dict):
+        """Send a json response."""
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond(self, route):
+        """Respond via the route, after any injected latency or error."""
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.delay()
+        if route is None:
+            self.send_json(404, {"ErrorMessage": "Not found."})
+        elif self.server.should_fail():
+            self.send_json(503, {"ErrorMessage": "Service unavailable."})
+        else:
+            self.send_json(*route(body))
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Respond to a GET request."""
+        routes = {KEYPAD_PATH: lambda body: (200, self.server.new_keypad())}
+        self.respond(routes.get(self.path))
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Respond to a POST request."""
+        routes = {ISSUE_PATH: lambda body: self.server.issue(self.headers, body)}
+        self.respond(routes.get(self.path))
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Only log requests when the server is run from the cli."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def get_arguments():
+    """Parse and return the arguments passed on the cli."""
+    parser = argparse.ArgumentParser(description="Run a fake ING api locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--pins", help="json file mapping cifs to pins (default: accept any pin)"
+    )
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return vars(parser.parse_args())
+
+
+def main():
+    """Run the fake server until interrupted."""
+    args = get_arguments()
+    pins = None
+    if args["pins"]:
+        with open(args["pins"]) as fyle:
+            pins = json.load(fyle)
+    server = FakeIngServer(
+        (args["host"], args["port"]),
+        pins=pins,
+        latency=args["latency"],
+        jitter=args["jitter"],
+        tail_rate=args["tail_rate"],
+        tail_latency=args["tail_latency"],
+        error_rate=args["error_rate"],
+        seed=args["seed"],
+    )
+    server.verbose = args["verbose"]
+    print(f"Serving a fake ING api on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+ING's keypad, decoded once and shared between ocr and rendering.
+
+ING returns the keypad as ten base64 encoded tiles, one per position. They are
+decoded into a single (10, H, W, 3) BGR stack on first use, which both the ocr
+and the renderer read from directly.
+"""
+import functools
+import os
+import threading
+from typing import List, Optional, Sequence
+
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+from common.utils import ocr
+from common.utils.ocr import aio as ocr_aio
+
+FONT_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    os.pardir,
+    "Arcon-Regular.otf",
+)
+# the (row, column) of each position when the keypad is shown as a grid, the
+# last position sits in the middle of the bottom row
+GRID_COLUMNS = 3
+GRID_ROWS = 4
+GRID_CELLS = [(row, column) for row in range(3) for column in range(3)] + [(3, 1)]
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size: int = 22) -> ImageFont.FreeTypeFont:
+    """Return the font keypad positions are labelled with."""
+    return ImageFont.truetype(FONT_PATH, size=size)
+
+
+class Keypad:
+    """The keypad's tiles, decoded on first use."""
+
+    def __init__(self, b64_images: Sequence[str]):
+        """Hold the base64 encoded tiles, one per position."""
+        self.b64_images = list(b64_images)
+        self._tiles: Optional[numpy.ndarray] = None
+        self._digits: Optional[List[int]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tiles(self) -> numpy.ndarray:
+        """Return the decoded (BGR) tiles as one stack."""
+        with self._lock:
+            if self._tiles is None:
+                first = ocr.b64_to_image(self.b64_images[0])
+                tiles = numpy.empty((len(self.b64_images), *first.shape), numpy.uint8)
+                tiles[0] = first
+                for tile, b64_image in zip(tiles[1:], self.b64_images[1:]):
+                    tile[:] = ocr.b64_to_image(b64_image)
+                self._tiles = tiles
+            return self._tiles
+
+    def digits(self) -> List[int]:
+        """
+        Return the digit shown on each position.
+
+        Raises ValueError if any tile does not contain an integer.
+        """
+        if self._digits is None:
+            self._digits = ocr.images_to_ints(self.tiles)
+        return list(self._digits)
+
+    async def adigits(self) -> List[int]:
+        """
+        Return the digit shown on each position, without blocking the event loop.
+
+        The tiles are decoded and recognised in the ocr process pool.
+
+        Raises ValueError if any tile does not contain an integer.
+        """
+        if self._digits is None:
+            self._digits = await ocr_aio.ab64_images_to_ints(self.b64_images)
+        return list(self._digits)
+
+    def render(self, labels=True) -> numpy.ndarray:
+        """
+        Return the keypad as an RGB grid of its tiles.
+
+        Each tile is labelled with its position unless `labels` is False.
+        """
+        tiles = self.tiles
+        height, width = tiles.shape[1:3]
+        grid = numpy.zeros((GRID_ROWS * height, GRID_COLUMNS * width, 3), numpy.uint8)
+        for tile, (row, column) in zip(tiles, GRID_CELLS):
+            # reversing the channels converts BGR to RGB as the tile is copied
+            grid[
+                row * height : (row + 1) * height,
+                column * width : (column + 1) * width,
+            ] = tile[..., ::-1]
+        if labels:
+            image = Image.fromarray(grid)
+            draw = ImageDraw.Draw(image)
+            for position, (row, column) in enumerate(GRID_CELLS[: len(tiles)]):
+                draw.text(
+                    (column * width, row * height), str(position), font=get_font()
+                )
+            grid = numpy.asarray(image)
+        return grid
+
+    def show(self):
+        """Show the labelled keypad in an image viewer."""
+        Image.fromarray(self.render()).show()
@@ -0,0 +1,264 @@
+"""
+Pool of pre-generated RSA keys for signing requests to ING.
+
+Generating a key takes tens to hundreds of milliseconds of CPU, so rather than
+generating one for every login a background thread keeps a pool topped up and
+logins take a ready made key. Each key is handed out only once.
+
+The pool can be persisted to disk so that a restarted process does not start
+cold. The keys are encrypted with AES-GCM under a key derived (with scrypt)
+from a passphrase, which is only derived once per pool. Several processes may
+share the file: a process claims every key in it when it starts and returns
+the keys it has left when it stops, holding a lock on the file throughout, so
+a key is never handed out by two processes. A process forked from one with a
+pool starts with an empty pool (and its own background thread).
+"""
+import atexit
+import base64
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from collections import deque
+from typing import Deque, List, Optional
+
+from Crypto import Random
+from Crypto.Cipher import AES
+from Crypto.Protocol.KDF import scrypt
+from Crypto.PublicKey import RSA
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 1024
+SALT_SIZE = 16
+
+
+def generate_rsa_key(bits: int = KEY_SIZE) -> RSA.RsaKey:
+    """Generate a new RSA keypair."""
+    rng = Random.new().read
+    return RSA.generate(bits, rng)
+
+
+class KeyPool:
+    """Thread safe pool of RSA keys, refilled in the background."""
+
+    def __init__(
+        self,
+        size: int = 8,
+        bits: int = KEY_SIZE,
+        path: Optional[str] = None,
+        passphrase: Optional[str] = None,
+    ):
+        """
+        Configure the pool, claiming any keys persisted at `path`.
+
+        The background thread is not started until the pool is first used (or
+        `start` is called). Keys left in a persisted pool are returned to the
+        file when it is closed, or when the process exits.
+        """
+        if path is not None and not passphrase:
+            raise ValueError("A passphrase is required to persist keys.")
+        self.size = size
+        self.bits = bits
+        self.path = path
+        self._passphrase = passphrase
+        self._keys: Deque[RSA.RsaKey] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._salt = Random.get_random_bytes(SALT_SIZE)
+        self._cipher_key: Optional[bytes] = None
+        if path is not None:
+            self._load()
+            atexit.register(self._persist)
+        _pools.add(self)
+
+    def __len__(self):
+        """Return the number of keys ready to be handed out."""
+        return len(self._keys)
+
+    def start(self):
+        """Start the background thread which keeps the pool topped up."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The key pool is closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ing-key-pool", daemon=True
+                )
+                self._thread.start()
+
+    def close(self):
+        """Stop the background thread, returning any keys left to the file."""
+        with self._condition:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        self._persist()
+
+    def get(self) -> RSA.RsaKey:
+        """
+        Return a key which has not been handed out before.
+
+        If the pool is empty a key is generated immediately rather than waiting
+        for the background thread.
+        """
+        if not self._closed:
+            self.start()
+        with self._condition:
+            key = self._keys.popleft() if self._keys else None
+            self._condition.notify_all()
+        return key if key is not None else generate_rsa_key(self.bits)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and len(self._keys) >= self.size:
+                    self._condition.wait()
+                if self._closed:
+                    return
+            key = generate_rsa_key(self.bits)
+            with self._condition:
+                self._keys.append(key)
+                self._condition.notify_all()
+
+    def _after_fork(self):
+        # the parent's keys (and its lock, which may have been held) stay with
+        # the parent, and its background thread was not forked
+        self._keys = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def _get_cipher_key(self, salt: bytes) -> bytes:
+        if self._cipher_key is None or salt != self._salt:
+            self._salt = salt
+            self._cipher_key = scrypt(self._passphrase, salt, 32, N=2 ** 14, r=8, p=1)
+        return self._cipher_key
+
+    def _lock_file(self):
+        """Return the (locked) lock file of the persisted keys."""
+        lock = open(f"{self.path}.lock", "a")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _load(self):
+        """Claim the persisted keys, so that no other process loads them."""
+        try:
+            with self._lock_file():
+                pems = self._read()
+                if pems:
+                    self._write([])
+        except OSError:
+            logger.warning("Unable to load the persisted RSA keys.", exc_info=True)
+            return
+        self._keys.extend(RSA.import_key(pem) for pem in pems)
+
+    def _persist(self):
+        """Return the keys left in the pool to the file, emptying the pool."""
+        if self.path is None:
+            return
+        with self._condition:
+            keys, self._keys = self._keys, deque()
+        pems = [key.export_key().decode("ascii") for key in keys]
+        if not pems:
+            return
+        try:
+            with self._lock_file():
+                # keep the keys other processes have returned too
+                self._write((self._read() + pems)[: max(self.size, len(pems))])
+        except OSError:
+            logger.warning("Unable to persist the RSA keys.", exc_info=True)
+
+    def _read(self) -> List[str]:
+        """Return the pems in the file, which must be locked."""
+        try:
+            with open(self.path) as fyle:
+                stored = json.load(fyle)
+            cipher = AES.new(
+                self._get_cipher_key(base64.b64decode(stored["salt"])),
+                AES.MODE_GCM,
+                nonce=base64.b64decode(stored["nonce"]),
+            )
+            return json.loads(
+                cipher.decrypt_and_verify(
+                    base64.b64decode(stored["keys"]), base64.b64decode(stored["tag"])
+                )
+            )
+        except FileNotFoundError:
+            return []
+        except (ValueError, KeyError):
+            # e.g. a corrupt file or the passphrase has changed, start afresh
+            logger.warning("Unable to load the persisted RSA keys.", exc_info=True)
+            self._get_cipher_key(Random.get_random_bytes(SALT_SIZE))
+            return []
+
+    def _write(self, pems: List[str]):
+        """Replace the pems in the file, which must be locked."""
+        cipher = AES.new(self._get_cipher_key(self._salt), AES.MODE_GCM)
+        keys, tag = cipher.encrypt_and_digest(json.dumps(pems).encode("utf-8"))
+        stored = {
+            name: base64.b64encode(value).decode("ascii")
+            for name, value in [
+                ("salt", self._salt),
+                ("nonce", cipher.nonce),
+                ("tag", tag),
+                ("keys", keys),
+            ]
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as fyle:
+            json.dump(stored, fyle)
+        os.chmod(fyle.name, 0o600)
+        os.replace(fyle.name, self.path)
+
+
+# every pool in the process, to be reset in forked processes
+_pools: "weakref.WeakSet[KeyPool]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for key_pool in list(_pools):
+        key_pool._after_fork()  # pylint: disable=protected-access
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+_key_pool_lock = threading.Lock()
+_key_pool: Optional[KeyPool] = None
+
+
+def get_key_pool() -> KeyPool:
+    """
+    Return the process wide key pool.
+
+    When django is configured the pool's size is `ING_KEY_POOL_SIZE` and it is
+    persisted to `ING_KEY_POOL_PATH` (encrypted with `ING_KEY_POOL_PASSPHRASE`)
+    if a path is set.
+    """
+    global _key_pool  # pylint: disable=global-statement
+    if _key_pool is None:
+        with _key_pool_lock:
+            if _key_pool is None:
+                options = {}
+                if settings.configured:
+                    options = {
+                        "size": getattr(settings, "ING_KEY_POOL_SIZE", 8),
+                        "path": getattr(settings, "ING_KEY_POOL_PATH", None),
+                        "passphrase": getattr(
+                            settings, "ING_KEY_POOL_PASSPHRASE", None
+                        ),
+                    }
+                _key_pool = KeyPool(**options)
+    return _key_pool
+
+
+def set_key_pool(key_pool: Optional[KeyPool]):
+    """Set the process wide key pool (None to configure it again)."""
+    global _key_pool  # pylint: disable=global-statement
+    _key_pool = key_pool
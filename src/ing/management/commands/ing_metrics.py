@@ -0,0 +1,25 @@
+"""Management command to report the ING client's metrics."""
+import json
+
+from django.core.management.base import BaseCommand
+
+from ing.metrics import get_metrics_exporter, registry
+
+
+class Command(BaseCommand):
+    """Management command to report the ING client's metrics."""
+
+    help = "Write the merged metrics of every worker as json."
+
+    def handle(self, *args, **options):
+        """Run the management command."""
+        exporter = get_metrics_exporter()
+        if exporter is None:
+            self.stderr.write(
+                "ING_METRICS_REDIS_URL is not set, only this process's metrics "
+                "are reported."
+            )
+            snapshot = registry.snapshot()
+        else:
+            snapshot = exporter.collect()
+        self.stdout.write(json.dumps(snapshot, indent=2))
@@ -0,0 +1,330 @@
+"""
+Metrics of the ING client's calls.
+
+Metrics are identified by a name and labels, and each process's registry can be
+snapshotted as plain json. An exporter publishes every process's snapshot to
+redis by the wsgi application and celery's workers, from where they are
+collected and merged (see the `ing_metrics` management command).
+"""
+import bisect
+import copy
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (in seconds) of the histograms' buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """A count of events."""
+
+    kind = "counter"
+
+    def __init__(self):
+        """Start at zero."""
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        """Count events."""
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> int:
+        """Return the count."""
+        return self.value
+
+
+class Gauge:
+    """A value which may go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self):
+        """Start at zero."""
+        self.value = 0.0
+
+    def set(self, value: float):
+        """Set the value."""
+        self.value = value
+
+    def snapshot(self) -> float:
+        """Return the value."""
+        return self.value
+
+
+class Histogram:
+    """The distribution of observed durations."""
+
+    kind = "histogram"
+
+    def __init__(self):
+        """Start with no observations."""
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record an observation."""
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+            self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the count, sum, max and cumulative count below each bucket."""
+        with self._lock:
+            cumulative, total = {}, 0
+            for bound, count in zip(BUCKETS, self.buckets):
+                total += count
+                cumulative[str(bound)] = total
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "max": self.max,
+                "buckets": cumulative,
+            }
+
+
+class Registry:
+    """Thread safe collection of metrics."""
+
+    def __init__(self):
+        """Start with no metrics."""
+        self._metrics: Dict[Tuple[str, Labels], Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class, name: str, labels: Dict[str, Any]):
+        key = (
+            name,
+            tuple(sorted((label, str(value)) for label, value in labels.items())),
+        )
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = metric_class()
+        return metric
+
+    def counter(self, name: str, **labels) -> Counter:
+        """Return the counter with the name and labels."""
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        """Return the gauge with the name and labels."""
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """Return the histogram with the name and labels."""
+        return self._get(Histogram, name, labels)
+
+    def snapshot(self) -> Dict[str, list]:
+        """Return every metric's labels, type and value, grouped by name."""
+        with self._lock:
+            metrics = list(self._metrics.items())
+        snapshot: Dict[str, list] = {}
+        for (name, labels), metric in sorted(metrics, key=lambda item: item[0]):
+            snapshot.setdefault(name, []).append(
+                {
+                    "labels": dict(labels),
+                    "type": metric.kind,
+                    "value": metric.snapshot(),
+                }
+            )
+        return snapshot
+
+    def clear(self):
+        """Remove every metric."""
+        with self._lock:
+            self._metrics.clear()
+
+
+# the process wide registry
+registry = Registry()
+
+
+def _merge_histograms(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "count": first["count"] + second["count"],
+        "sum": first["sum"] + second["sum"],
+        "max": max(first["max"], second["max"]),
+        "buckets": {
+            bound: count + second["buckets"].get(bound, 0)
+            for bound, count in first["buckets"].items()
+        },
+    }
+
+
+# how the values of each type of metric from two processes are combined
+MERGES = {
+    Counter.kind: lambda first, second: first + second,
+    Gauge.kind: max,
+    Histogram.kind: _merge_histograms,
+}
+
+
+def merge(snapshots: Iterable[Dict[str, list]]) -> Dict[str, list]:
+    """
+    Return the snapshots of several processes combined into one.
+
+    Counters and histograms are summed, and gauges take their highest value
+    (e.g. a breaker which is open in any process is reported as open).
+    """
+    merged: Dict[Tuple[str, Labels], Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for name, metrics in snapshot.items():
+            for metric in metrics:
+                key = (name, tuple(sorted(metric["labels"].items())))
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = copy.deepcopy(metric)
+                else:
+                    merge_values = MERGES[metric["type"]]
+                    current["value"] = merge_values(current["value"], metric["value"])
+    result: Dict[str, list] = {}
+    for (name, _), metric in sorted(merged.items(), key=lambda item: item[0]):
+        result.setdefault(name, []).append(metric)
+    return result
+
+
+class MetricsExporter:
+    """Publish the process's metrics to redis, and collect every process's."""
+
+    def __init__(
+        self,
+        redis_url: str,
+        key_prefix: str = "ing-metrics",
+        interval: float = 15.0,
+        metrics: Registry = registry,
+    ):
+        """
+        Connect lazily to redis.
+
+        Snapshots are published every `interval` seconds once started, and
+        expire if their process stops publishing them.
+        """
+        self.key_prefix = key_prefix
+        self.interval = interval
+        self.metrics = metrics
+        self._redis = redis.Redis.from_url(redis_url)
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        """Return the key the process's snapshot is published at."""
+        return f"{self.key_prefix}:{socket.gethostname()}:{os.getpid()}"
+
+    def publish(self):
+        """Publish the process's snapshot."""
+        try:
+            self._redis.set(
+                self.key,
+                json.dumps(self.metrics.snapshot()),
+                ex=math.ceil(3 * self.interval),
+            )
+        except redis.RedisError:
+            logger.warning("Unable to publish the ing metrics.", exc_info=True)
+
+    def collect(self) -> Dict[str, list]:
+        """
+        Return the merged snapshots of every process publishing them.
+
+        Only this process's metrics are returned if redis cannot be used.
+        """
+        try:
+            keys = list(self._redis.scan_iter(f"{self.key_prefix}:*"))
+            values = self._redis.mget(keys) if keys else []
+        except redis.RedisError:
+            logger.warning("Unable to collect the ing metrics.", exc_info=True)
+            return self.metrics.snapshot()
+        return merge(json.loads(value) for value in values if value is not None)
+
+    def start(self):
+        """
+        Publish from a background thread, unless one is already running.
+
+        The thread is started again in processes forked from this one.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name="ing-metrics", daemon=True).start()
+
+    def _after_fork(self):
+        # the parent's lock may have been held, and its thread was not forked
+        self._lock = threading.Lock()
+        if self._pid is not None:
+            self.start()
+
+    def _run(self):
+        while True:
+            self.publish()
+            time.sleep(self.interval)
+
+
+_exporter_lock = threading.Lock()
+_exporter: Optional[MetricsExporter] = None
+
+
+def get_metrics_exporter() -> Optional[MetricsExporter]:
+    """
+    Return the process wide exporter, or None if metrics are not shared.
+
+    Metrics are shared through `ING_METRICS_REDIS_URL` when django is configured
+    with it, and published every `ING_METRICS_INTERVAL` seconds.
+    """
+    global _exporter  # pylint: disable=global-statement
+    if _exporter is None and settings.configured:
+        redis_url = getattr(settings, "ING_METRICS_REDIS_URL", None)
+        if redis_url:
+            with _exporter_lock:
+                if _exporter is None:
+                    _exporter = MetricsExporter(
+                        redis_url,
+                        interval=getattr(settings, "ING_METRICS_INTERVAL", 15.0),
+                    )
+    return _exporter
+
+
+def set_metrics_exporter(exporter: Optional[MetricsExporter]):
+    """Set the process wide exporter (None to configure it again)."""
+    global _exporter  # pylint: disable=global-statement
+    _exporter = exporter
+
+
+def start_metrics_exporter() -> Optional[MetricsExporter]:
+    """
+    Start publishing the process's metrics, if they are shared.
+
+    This is called by the processes which call ING (the wsgi application and
+    celery's workers), rather than by every process using django.
+    """
+    exporter = get_metrics_exporter()
+    if exporter is not None:
+        exporter.start()
+    return exporter
+
+
+def _after_fork_in_child():
+    if _exporter is not None:
+        _exporter._after_fork()  # pylint: disable=protected-access
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
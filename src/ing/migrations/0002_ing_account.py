@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("ing", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngAccount",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cif",
+                    models.CharField(max_length=32, unique=True, verbose_name="cif"),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ing_accounts",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "ing account",
+                "verbose_name_plural": "ing accounts",
+                "ordering": ["cif"],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+"""ING models."""
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class IngAccount(models.Model):
+    """An ING client (cif) which a user owns, and may log in to."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="ing_accounts",
+        verbose_name=_("user"),
+    )
+    cif = models.CharField(_("cif"), max_length=32, unique=True)
+    created = models.DateTimeField(_("created"), auto_now_add=True)
+
+    class Meta:
+        """Model meta options."""
+
+        verbose_name = _("ing account")
+        verbose_name_plural = _("ing accounts")
+        ordering = ["cif"]
+
+    def __str__(self):
+        """Return the cif."""
+        return self.cif
+
+
+class IngSession(models.Model):
+    """A login to ING, run in the background, and the token it was issued."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, _("pending")),
+        (RUNNING, _("running")),
+        (SUCCEEDED, _("succeeded")),
+        (FAILED, _("failed")),
+    ]
+    FINISHED = [SUCCEEDED, FAILED]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="ing_sessions",
+        verbose_name=_("user"),
+    )
+    cif = models.CharField(_("cif"), max_length=32)
+    status = models.CharField(
+        _("status"), max_length=16, choices=STATUSES, default=PENDING
+    )
+    token = models.TextField(_("token"), blank=True)
+    expires_at = models.DateTimeField(_("expires at"), null=True, blank=True)
+    error = models.TextField(_("error"), blank=True)
+    created = models.DateTimeField(_("created"), auto_now_add=True)
+    updated = models.DateTimeField(_("updated"), auto_now=True)
+
+    class Meta:
+        """Model meta options."""
+
+        verbose_name = _("ing session")
+        verbose_name_plural = _("ing sessions")
+        ordering = ["-created"]
+
+    class JSONAPIMeta:
+        """JSONAPI meta information."""
+
+        resource_name = "ing-sessions"
+
+    def __str__(self):
+        """Return the cif and status."""
+        return f"{self.cif} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        """Return whether the login has succeeded or failed."""
+        return self.status in self.FINISHED
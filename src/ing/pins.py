@@ -0,0 +1,125 @@
+"""
+Providers of the pins used to log in without prompting.
+
+A pin is only ever read from its provider when it is needed to log in, and is
+never stored on the client.
+"""
+import json
+import os
+import stat
+from typing import Dict, Optional, Sequence
+
+from django.conf import settings
+
+
+class PinProvider:
+    """Base class for pin providers."""
+
+    def get_pin(self, cif: str) -> str:
+        """
+        Return the pin of the client.
+
+        Raises LookupError if the provider has no pin for the client.
+        """
+        raise NotImplementedError
+
+
+class StaticPinProvider(PinProvider):
+    """Provide pins held in memory, keyed by cif."""
+
+    def __init__(self, pins: Dict[str, str]):
+        """Set the pins."""
+        self._pins = dict(pins)
+
+    def get_pin(self, cif: str) -> str:
+        """Return the pin of the client."""
+        try:
+            return self._pins[cif]
+        except KeyError:
+            raise LookupError(f"No pin for client {cif}.") from None
+
+
+class EnvironPinProvider(PinProvider):
+    """Provide pins from `<prefix>_<cif>` environment variables, or `<prefix>`."""
+
+    def __init__(self, prefix: str = "ING_PIN", fallback: bool = True):
+        """
+        Set the prefix of the environment variables.
+
+        The `<prefix>` variable is only used (for every client without its own
+        variable) if `fallback` is set.
+        """
+        self.prefix = prefix
+        self.fallback = fallback
+
+    def get_pin(self, cif: str) -> str:
+        """Return the pin of the client."""
+        names = [f"{self.prefix}_{cif}"] + ([self.prefix] if self.fallback else [])
+        for name in names:
+            if os.environ.get(name):
+                return os.environ[name]
+        raise LookupError(f"No pin for client {cif}.")
+
+
+class FilePinProvider(PinProvider):
+    """
+    Provide pins from a json file mapping cifs to pins.
+
+    The file is read every time a pin is needed, and must not be readable by
+    anyone but its owner.
+    """
+
+    def __init__(self, path: str):
+        """Set the path of the file."""
+        self.path = path
+
+    def get_pin(self, cif: str) -> str:
+        """Return the pin of the client."""
+        with open(self.path) as fyle:
+            if os.fstat(fyle.fileno()).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                raise PermissionError(f"{self.path} is accessible by other users.")
+            pins = json.load(fyle)
+        return StaticPinProvider(pins).get_pin(cif)
+
+
+_pin_provider: Optional[PinProvider] = None
+
+
+def get_pin_provider() -> PinProvider:
+    """
+    Return the process wide pin provider, used to log in in the background.
+
+    Pins are read from the `ING_PIN_FILE` when django is configured with one,
+    otherwise from the client's own environment variable (never `$ING_PIN`, so
+    that a login can never be attempted with another client's pin).
+    """
+    global _pin_provider  # pylint: disable=global-statement
+    if _pin_provider is None:
+        path = getattr(settings, "ING_PIN_FILE", None) if settings.configured else None
+        _pin_provider = (
+            FilePinProvider(path) if path else EnvironPinProvider(fallback=False)
+        )
+    return _pin_provider
+
+
+def set_pin_provider(pin_provider: Optional[PinProvider]):
+    """Set the process wide pin provider (None to configure it again)."""
+    global _pin_provider  # pylint: disable=global-statement
+    _pin_provider = pin_provider
+
+
+def pin_to_key_positions(pin: str, digits: Sequence[int]) -> str:
+    """
+    Return the keypad positions of the pin's digits, comma separated.
+
+    `digits` are the digits shown on each position of the keypad.
+
+    Raises ValueError if the keypad does not show each digit exactly once or
+    the pin is not made up of digits.
+    """
+    if sorted(digits) != list(range(10)):
+        raise ValueError("The keypad does not show each digit exactly once.")
+    if not pin.isdigit():
+        raise ValueError("The pin must only contain digits.")
+    positions = {digit: position for position, digit in enumerate(digits)}
+    return ",".join(str(positions[int(digit)]) for digit in pin)
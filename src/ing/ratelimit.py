@@ -0,0 +1,233 @@
+"""
+Token bucket scheduling of the calls made to ING.
+
+Each endpoint has a budget: a sustained rate (requests per second) and a burst
+it may briefly exceed that by. Callers wait until the endpoint's bucket has a
+token for them, so calls run at the fastest rate ING is known to tolerate
+rather than at a fixed concurrency. Buckets are kept in process, or in redis
+so that every worker shares the budget.
+
+Background calls may not take the tokens reserved for interactive ones, so a
+backlog of background work never delays a user logging in.
+"""
+import enum
+import logging
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import redis
+from django.conf import settings
+
+from ing.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# the budget used for endpoints without their own
+DEFAULT_ENDPOINT = "default"
+
+# refill the bucket, then take a token if that would leave at least the reserve,
+# returning how long (in seconds) to wait before trying again otherwise. The
+# time is redis' own, as the clocks of the hosts sharing the bucket may differ
+# (reading it before writing needs effects replication before redis 5)
+TAKE_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+-- never move the bucket back in time (e.g. after failing over to a replica)
+now = math.max(now, updated)
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+else
+    wait = (reserve + 1 - tokens) / rate
+end
+redis.call("HMSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class Priority(enum.IntEnum):
+    """Classes of calls, the most important first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# the proportion of each bucket which calls of each priority may not take (at
+# most all but one token, so that every priority may take a full bucket)
+RESERVES = {Priority.INTERACTIVE: 0.0, Priority.BACKGROUND: 0.5}
+
+
+class Budget(NamedTuple):
+    """The sustained rate (per second) and burst of calls to an endpoint."""
+
+    rate: float
+    burst: int
+
+
+class TokenBucket:
+    """In process token bucket."""
+
+    def __init__(self, budget: Budget):
+        """Start with a full bucket."""
+        self.budget = budget
+        self._tokens = float(budget.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, reserve: float = 0) -> float:
+        """
+        Take a token if at least `reserve` tokens would remain.
+
+        Returns 0 if a token was taken, otherwise the seconds until one may be.
+        """
+        rate, capacity = self.budget
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(capacity, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens - 1 >= reserve:
+                self._tokens -= 1
+                return 0
+            return (reserve + 1 - self._tokens) / rate
+
+
+class RedisTokenBucket:
+    """Token bucket shared between processes through redis."""
+
+    def __init__(self, budget: Budget, client: redis.Redis, key: str):
+        """Use the bucket stored at the key."""
+        self.budget = budget
+        self.key = key
+        self._script = client.register_script(TAKE_SCRIPT)
+
+    def take(self, reserve: float = 0) -> float:
+        """
+        Take a token if at least `reserve` tokens would remain.
+
+        Returns 0 if a token was taken, otherwise the seconds until one may be.
+        """
+        args = [self.budget.rate, self.budget.burst, reserve]
+        return float(self._script(keys=[self.key], args=args))
+
+
+class RateScheduler:
+    """Schedule calls to each endpoint within its budget."""
+
+    def __init__(
+        self,
+        budgets: Dict[str, Budget],
+        redis_url: Optional[str] = None,
+        key_prefix: str = "ing-rate",
+    ):
+        """
+        Set the budget of each endpoint (its path, or `DEFAULT_ENDPOINT`).
+
+        Endpoints without a budget, when there is no default, are not limited.
+        Buckets are shared through redis if a url is given. Raises ValueError
+        for a budget which would never allow a call.
+        """
+        self.budgets = {
+            endpoint: Budget(*budget) for endpoint, budget in budgets.items()
+        }
+        for endpoint, budget in self.budgets.items():
+            if not budget.rate > 0 or budget.burst < 1:
+                raise ValueError(
+                    f"The budget of {endpoint} needs a positive rate and a burst "
+                    "of at least 1."
+                )
+        self.key_prefix = key_prefix
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._local_buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _get_budget(self, path: str) -> Optional[Budget]:
+        return self.budgets.get(path, self.budgets.get(DEFAULT_ENDPOINT))
+
+    def _get_bucket(self, endpoint: str, budget: Budget, local=False):
+        buckets = self._local_buckets if local or self._redis is None else self._buckets
+        with self._lock:
+            bucket = buckets.get(endpoint)
+            if bucket is None:
+                if buckets is self._local_buckets:
+                    bucket = TokenBucket(budget)
+                else:
+                    key = f"{self.key_prefix}:{endpoint}"
+                    bucket = RedisTokenBucket(budget, self._redis, key)
+                buckets[endpoint] = bucket
+        return bucket
+
+    def _take(self, endpoint: str, budget: Budget, reserve: float) -> float:
+        bucket = self._get_bucket(endpoint, budget)
+        try:
+            return bucket.take(reserve)
+        except redis.RedisError:
+            logger.warning("Unable to use the shared rate limit.", exc_info=True)
+            return self._get_bucket(endpoint, budget, local=True).take(reserve)
+
+    def acquire(
+        self,
+        url: str,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+    ) -> float:
+        """
+        Wait until a call to the url is within its endpoint's budget.
+
+        Returns the seconds spent waiting. Raises TimeoutError if the call
+        would have to wait longer than `timeout` seconds.
+        """
+        parts = urlsplit(url)
+        budget = self._get_budget(parts.path)
+        if budget is None:
+            return 0.0
+        endpoint = f"{parts.netloc}{parts.path}"
+        reserve = min(RESERVES[priority] * budget.burst, budget.burst - 1)
+        start = time.monotonic()
+        while True:
+            wait = self._take(endpoint, budget, reserve)
+            if not wait:
+                break
+            waited = time.monotonic() - start
+            if timeout is not None and waited + wait > timeout:
+                registry.counter(
+                    "ing_rate_timeouts", endpoint=parts.path, priority=priority.name
+                ).inc()
+                raise TimeoutError(f"Rate limited calling {parts.path}.")
+            time.sleep(wait)
+        waited = time.monotonic() - start
+        registry.histogram(
+            "ing_rate_queue_seconds", endpoint=parts.path, priority=priority.name
+        ).observe(waited)
+        return waited
+
+
+def get_rate_scheduler() -> Optional[RateScheduler]:
+    """
+    Return a scheduler configured by django's settings, or None if unlimited.
+
+    `ING_RATE_LIMITS` maps endpoints (paths, or "default") to their
+    [rate, burst], shared through `ING_RATE_LIMIT_REDIS_URL` when it is set.
+    Raises ValueError for a budget which would never allow a call.
+    """
+    if not settings.configured:
+        return None
+    budgets = getattr(settings, "ING_RATE_LIMITS", None)
+    if not budgets:
+        return None
+    return RateScheduler(
+        budgets, redis_url=getattr(settings, "ING_RATE_LIMIT_REDIS_URL", None)
+    )
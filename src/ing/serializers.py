@@ -0,0 +1,26 @@
+"""Serializers for the ing app."""
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework_json_api import serializers
+
+from ing.models import IngSession
+
+
+class IngSessionSerializer(serializers.ModelSerializer):
+    """Ing sessions serializer, only the cif is given when creating one."""
+
+    user = serializers.ResourceRelatedField(read_only=True)
+
+    class Meta:
+        """Serializer meta information."""
+
+        model = IngSession
+        fields = ["cif", "status", "token", "expires_at", "error", "created", "user"]
+        read_only_fields = ["status", "token", "expires_at", "error", "created"]
+
+    def validate_cif(self, value):
+        """Ensure the user owns the client."""
+        user = self.context["request"].user
+        if not user.ing_accounts.filter(cif=value).exists():
+            raise ValidationError(_("You may only log in to your own clients."))
+        return value
@@ -0,0 +1,51 @@
+"""Tasks logging in to ING in the background."""
+from datetime import datetime, timezone
+from typing import Optional
+
+from celery import shared_task
+
+from ing.api import IngApi
+from ing.models import IngAccount, IngSession
+from ing.pins import get_pin_provider
+from ing.tokens import TokenStore
+
+
+def log_in(session: IngSession, token_store: Optional[TokenStore] = None, **options):
+    """
+    Log the session's client in, saving the token issued or the error.
+
+    The options are passed to `IngApi`. A fresh token already in the token
+    store for the session's user is used rather than logging in again.
+    """
+    session.status = IngSession.RUNNING
+    session.save(update_fields=["status", "updated"])
+    options.setdefault("pin_provider", get_pin_provider())
+    try:
+        # the cif was checked when the session was created, but may since have
+        # been taken from the user
+        owned = IngAccount.objects.filter(user=session.user_id, cif=session.cif)
+        if not owned.exists():
+            raise PermissionError(f"The user does not own client {session.cif}.")
+        api = IngApi(session.cif, **options)
+        token = api.get_token(token_store, owner=f"user-{session.user_id}")
+    except Exception as error:  # pylint: disable=broad-except
+        session.status = IngSession.FAILED
+        session.error = f"{type(error).__name__}: {error}"
+    else:
+        session.status = IngSession.SUCCEEDED
+        session.token = token.value
+        session.expires_at = datetime.fromtimestamp(token.expires_at, timezone.utc)
+    session.save(update_fields=["status", "token", "expires_at", "error", "updated"])
+
+
+@shared_task(ignore_result=True)
+def log_in_session(session_id: str):
+    """
+    Log a pending session's client in.
+
+    The session is claimed atomically, so a redelivered task never logs in
+    twice.
+    """
+    pending = IngSession.objects.filter(pk=session_id, status=IngSession.PENDING)
+    if pending.update(status=IngSession.RUNNING, updated=datetime.now(timezone.utc)):
+        log_in(IngSession.objects.get(pk=session_id))
@@ -0,0 +1,57 @@
+"""Fakes of ING's api for the tests."""
+import threading
+
+from common.tests import factories
+from ing import keys
+
+# the digit shown on each position of the fake keypad
+KEYPAD = [7, 2, 9, 0, 4, 1, 8, 3, 6, 5]
+SERVER_KEY = keys.generate_rsa_key()
+
+
+class FakeResponse:
+    """Response holding json."""
+
+    def __init__(self, data):
+        """Set the json."""
+        self.data = data
+
+    def json(self):
+        """Return the json."""
+        return self.data
+
+    def raise_for_status(self):
+        """Succeed."""
+
+
+class FakeTransport:
+    """Transport answering as ING would, recording the threads it is used from."""
+
+    def __init__(self):
+        """Start with no requests."""
+        self.threads = set()
+        self.issued = []
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        """Return a keypad."""
+        self.threads.add(threading.get_ident())
+        return FakeResponse(
+            {
+                "KeypadImages": [factories.base64_images[str(i)] for i in KEYPAD],
+                "Secret": "secret",
+                "PemEncryptionKey": SERVER_KEY.publickey().export_key().decode(),
+            }
+        )
+
+    def post(self, url, headers=None, **kwargs):
+        """Return a token, recording the headers."""
+        self.threads.add(threading.get_ident())
+        self.issued.append(headers)
+        return FakeResponse({"Token": f"token-{headers['X-AuthCIF']}"})
+
+    def request(self, method, url, **kwargs):
+        """Return an empty response, recording the request."""
+        self.threads.add(threading.get_ident())
+        self.requests.append((method, url, kwargs))
+        return FakeResponse({})
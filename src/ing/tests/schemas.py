@@ -0,0 +1,23 @@
+"""Schemas for the ing app."""
+from typing import List, Union
+
+from hamcrest import instance_of
+
+from common.test.matchers import IsResourceObject, is_date, is_to_one
+from common.test.schemas import JsonApiSchema
+
+
+class IngSessionsSchema(JsonApiSchema):
+    """Schema for ing sessions."""
+
+    resource_name = "ing-sessions"
+    attributes = {
+        "cif": instance_of(str),
+        "status": instance_of(str),
+        "token": instance_of(str),
+        "expires_at": is_date(nullable=True),
+        "error": instance_of(str),
+        "created": is_date(),
+    }
+    relationships = {"user": is_to_one(resource_name="users")}
+    includes: List[Union[IsResourceObject, str]] = []
@@ -0,0 +1,88 @@
+"""Test the asyncio ING client works as expected."""
+import asyncio
+import base64
+import threading
+
+from Crypto.Cipher import PKCS1_v1_5 as cipher_method
+from Crypto.Hash import SHA
+from Crypto.Signature import PKCS1_v1_5
+from django.test import SimpleTestCase
+
+from common.utils.ocr import executor
+from ing import aio, keys, pins
+from ing.tests.fakes import KEYPAD, SERVER_KEY, FakeTransport
+
+
+class AsyncIngApiTestCase(SimpleTestCase):
+    """Test the asyncio ING client works as expected."""
+
+    def setUp(self):
+        """Use a small key pool and a fake transport."""
+        super().setUp()
+        self.key_pool = keys.KeyPool(size=2)
+        self.addCleanup(self.key_pool.close)
+        self.transport = FakeTransport()
+
+    def make_client(self, cif):
+        """Return a client using the fake transport."""
+        return aio.AsyncIngApi(
+            cif,
+            key_pool=self.key_pool,
+            transport=self.transport,
+            pin_provider=pins.StaticPinProvider({cif: "1357"}),
+        )
+
+    def test_login(self):
+        """Blocking calls run off the event loop's thread and ocr in its pool."""
+        self.addCleanup(executor.shutdown_executor)
+        client = self.make_client("12345678")
+
+        async def login():
+            response = await client.login()
+            return response, threading.get_ident()
+
+        response, loop_thread = asyncio.run(login())
+        self.assertEqual(response.json(), {"Token": "token-12345678"})
+        self.assertNotIn(loop_thread, self.transport.threads)
+
+        headers = self.transport.issued[0]
+        key = client._api.key  # pylint: disable=protected-access
+        self.assertEqual(headers["X-MessageSignKey"], hex(key.n)[2:])
+        self.assertTrue(
+            PKCS1_v1_5.new(key.publickey()).verify(
+                SHA.new(b"X-AuthToken:"), bytes.fromhex(headers["X-AuthSignature"])
+            )
+        )
+        pin = cipher_method.new(SERVER_KEY).decrypt(
+            base64.b64decode(headers["X-AuthPIN"]), None
+        )
+        self.assertEqual(pin, b"5,7,9,0")
+
+    def test_keypad_digits(self):
+        """The keypad recognises its digits in the ocr pool."""
+        self.addCleanup(executor.shutdown_executor)
+        client = self.make_client("12345678")
+
+        async def get_keypad_digits():
+            await client.init_login_request()
+            return await client.get_keypad_digits()
+
+        self.assertEqual(asyncio.run(get_keypad_digits()), KEYPAD)
+        # and keeps them
+        keypad = client._api.keypad  # pylint: disable=protected-access
+        self.assertEqual(keypad._digits, KEYPAD)  # pylint: disable=protected-access
+
+    def test_login_many(self):
+        """Many clients log in concurrently and their results are in order."""
+        self.addCleanup(executor.shutdown_executor)
+        cifs = [str(cif) for cif in range(10000000, 10000005)]
+        results = asyncio.run(
+            aio.login_many([self.make_client(cif) for cif in cifs], max_concurrency=2)
+        )
+        self.assertEqual(
+            [result.json()["Token"] for result in results],
+            [f"token-{cif}" for cif in cifs],
+        )
+        self.assertEqual(len(self.transport.issued), len(cifs))
+        # in threads of their own, one for each login running at once
+        self.assertLessEqual(len(self.transport.threads), 2)
@@ -0,0 +1,52 @@
+"""Test the ING client works as expected."""
+from Crypto.Hash import SHA
+from Crypto.Signature import PKCS1_v1_5
+from django.test import SimpleTestCase
+
+from ing import api, keys
+from ing.tests.fakes import FakeTransport
+
+
+class IngApiTestCase(SimpleTestCase):
+    """Test the ING client works as expected."""
+
+    def setUp(self):
+        """Create a client with a fake transport."""
+        super().setUp()
+        key_pool = keys.KeyPool(size=1)
+        self.addCleanup(key_pool.close)
+        self.transport = FakeTransport()
+        self.api = api.IngApi("12345678", key_pool=key_pool, transport=self.transport)
+        self.verifier = PKCS1_v1_5.new(self.api.key.publickey())
+
+    def assertSigned(self, message, signature):  # pylint: disable=invalid-name
+        """Assert the signature is the client's signature of the message."""
+        self.assertTrue(
+            self.verifier.verify(SHA.new(message), bytes.fromhex(signature))
+        )
+
+    def test_sign_body(self):
+        """The token and the encoded body are signed."""
+        self.api.token = "token"
+        body = {"AccountNumber": "1234", "Amount": 1.5}
+        data, signature = self.api.sign_body(body)
+        self.assertEqual(data, api.encode_body(body))
+        self.assertSigned(b"X-AuthToken:token" + data, signature)
+        self.assertEqual(self.api.get_signature(body), signature)
+
+        self.api.token = "refreshed"
+        self.assertSigned(b"X-AuthToken:refreshed", self.api.get_signature())
+        self.api.token = None
+        self.assertSigned(b"X-AuthToken:", self.api.get_signature())
+
+    def test_signed_request(self):
+        """The bytes which were signed are the bytes which are sent."""
+        self.api.token = "token"
+        self.api.signed_request("POST", "https://example.com", body=[1, 2, 3])
+        method, _, kwargs = self.transport.requests[0]
+        self.assertEqual(method, "POST")
+        self.assertEqual(kwargs["headers"]["X-AuthToken"], "token")
+        self.assertEqual(kwargs["headers"]["Content-Type"], "application/json")
+        self.assertSigned(
+            b"X-AuthToken:token" + kwargs["data"], kwargs["headers"]["X-AuthSignature"]
+        )
@@ -0,0 +1,34 @@
+"""Test batch logins work as expected."""
+from django.test import SimpleTestCase
+
+from ing import batch, pins, transport
+from ing.fake_server import FakeIngServer
+
+
+class BatchTestCase(SimpleTestCase):
+    """Test batch logins work as expected."""
+
+    def test_login_batch(self):
+        """Every client is logged in, sharing a key, with each stage timed."""
+        server = FakeIngServer(pins={"1": "1234", "2": "5678"}, seed=1)
+        server.start()
+        self.addCleanup(server.stop)
+        pooled = transport.Transport()
+        self.addCleanup(pooled.close)
+        results = list(
+            batch.login_batch(
+                ["1", "2", "3"],
+                parallel=2,
+                transport=pooled,
+                pin_provider=pins.StaticPinProvider({"1": "1234", "2": "5678"}),
+                base_url=server.base_url,
+            )
+        )
+        results = {result["cif"]: result for result in results}
+        for cif in ["1", "2"]:
+            with self.subTest(cif=cif):
+                self.assertEqual(results[cif]["status"], 200)
+                self.assertIn("Token", results[cif]["response"])
+                self.assertEqual(list(results[cif]["timings_ms"]), batch.STAGES)
+        self.assertEqual(results["3"]["error"], "LookupError: No pin for client 3.")
+        self.assertEqual(list(results["3"]["timings_ms"]), batch.STAGES[:3])
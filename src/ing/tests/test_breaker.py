@@ -0,0 +1,54 @@
+"""Test the circuit breakers work as expected."""
+import time
+
+from django.test import SimpleTestCase
+
+from ing.breaker import CircuitBreaker, CircuitBreakers, CircuitOpenError, State
+from ing.metrics import registry
+
+
+class BreakerTestCase(SimpleTestCase):
+    """Test the circuit breakers work as expected."""
+
+    def setUp(self):
+        """Start with no metrics."""
+        super().setUp()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_open(self):
+        """A breaker opens after too many failures in a row."""
+        breaker = CircuitBreaker("ing", failure_threshold=2, reset_timeout=60)
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        breaker.before()
+        breaker.failure()
+        self.assertEqual(breaker.state, State.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before()
+        self.assertEqual(registry.gauge("ing_breaker_state", service="ing").value, 2)
+        self.assertEqual(
+            registry.counter("ing_breaker_rejections", service="ing").value, 1
+        )
+
+    def test_probe(self):
+        """One call probes an open breaker's service, closing it if it succeeds."""
+        breaker = CircuitBreaker("ing", failure_threshold=1, reset_timeout=0.05)
+        breaker.failure()
+        time.sleep(0.05)
+        breaker.before()
+        self.assertEqual(breaker.state, State.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before()
+        breaker.success()
+        self.assertEqual(breaker.state, State.CLOSED)
+        breaker.before()
+
+    def test_services(self):
+        """Each service has its own breaker."""
+        breakers = CircuitBreakers()
+        keypad = breakers.get("https://ing.test/KeypadService/v1/PinpadImages")
+        self.assertEqual(keypad.name, "ing.test/KeypadService")
+        self.assertIs(breakers.get("https://ing.test/KeypadService/v2"), keypad)
+        self.assertIsNot(breakers.get("https://ing.test/STSServiceB2C/issue"), keypad)
@@ -0,0 +1,85 @@
+"""Test the client against the fake ING server."""
+from django.test import SimpleTestCase
+
+from common.utils.ocr import engines
+from common.utils.ocr.preprocess import b64_images_to_binarised
+from ing import fake_server, keys, pins, tokens, transport
+from ing.api import IngApi
+from ing.fake_server import FakeIngServer
+
+
+class FakeServerTestCase(SimpleTestCase):
+    """Test the client against the fake ING server."""
+
+    def setUp(self):
+        """Start a fake server."""
+        super().setUp()
+        self.key_pool = keys.KeyPool(size=2)
+        self.addCleanup(self.key_pool.close)
+        self.transport = transport.Transport()
+        self.addCleanup(self.transport.close)
+
+    def start_server(self, **kwargs):
+        """Start a fake server which is stopped after the test."""
+        server = FakeIngServer(pins={"12345678": "2580"}, seed=1, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_api(self, server, pin="2580"):
+        """Return a client of the fake server."""
+        return IngApi(
+            "12345678",
+            key_pool=self.key_pool,
+            transport=self.transport,
+            pin_provider=pins.StaticPinProvider({"12345678": pin}),
+            base_url=server.base_url,
+        )
+
+    def test_tiles(self):
+        """Every tile is read by the templates alone, as ING's tiles are."""
+        server = self.start_server()
+        engine = engines.TemplateEngine()
+        for digit, tiles in enumerate(server.tiles):
+            with self.subTest(digit=digit):
+                images = list(b64_images_to_binarised(tiles))
+                self.assertEqual(engine.images_to_digits(images), [digit] * len(tiles))
+
+    def test_login(self):
+        """A client logs in headlessly with the correct pin."""
+        server = self.start_server()
+        token = self.make_api(server).get_token(tokens.TokenStore())
+        self.assertTrue(token.is_fresh(margin=60))
+        self.assertEqual(server.keypads, {})
+
+    def test_keypads_forgotten(self):
+        """Only the latest keypads awaiting a login are remembered."""
+        self.addCleanup(setattr, fake_server, "MAX_KEYPADS", fake_server.MAX_KEYPADS)
+        fake_server.MAX_KEYPADS = 2
+        server = self.start_server()
+        secrets = [server.new_keypad()["Secret"] for _ in range(3)]
+        self.assertEqual(list(server.keypads), secrets[1:])
+
+    def test_incorrect_pin(self):
+        """Logging in with an incorrect pin fails."""
+        server = self.start_server()
+        response = self.make_api(server, pin="1234").login()
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalid_signature(self):
+        """Requests whose signature does not match their key are rejected."""
+        server = self.start_server()
+        api = self.make_api(server)
+        api.public_modulus = hex(keys.generate_rsa_key().n)[2:]
+        response = api.login()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["ErrorMessage"], "Invalid signature.")
+
+    def test_error_injection(self):
+        """Errors are injected at the configured rate."""
+        server = self.start_server(error_rate=1.0)
+        api = self.make_api(server)
+        with self.assertRaises(KeyError):
+            api.init_login_request()
+        response = self.transport.get(server.base_url + "/unknown")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,40 @@
+"""Test the keypad works as expected."""
+import numpy
+from django.test import SimpleTestCase
+
+from common.tests import factories
+from ing import keypad
+from ing.tests.fakes import KEYPAD
+
+
+class KeypadTestCase(SimpleTestCase):
+    """Test the keypad works as expected."""
+
+    def setUp(self):
+        """Create a keypad from the fake keypad's tiles."""
+        super().setUp()
+        self.keypad = keypad.Keypad(
+            [factories.base64_images[str(digit)] for digit in KEYPAD]
+        )
+
+    def test_tiles(self):
+        """The tiles are decoded once, into one stack."""
+        tiles = self.keypad.tiles
+        self.assertEqual(tiles.shape, (10, 110, 180, 3))
+        self.assertIs(self.keypad.tiles, tiles)
+
+    def test_digits(self):
+        """The digit on each position is read from the decoded tiles."""
+        self.assertEqual(self.keypad.digits(), KEYPAD)
+
+    def test_render(self):
+        """Tiles are laid out in a grid, the last in the middle of the bottom row."""
+        tiles = self.keypad.tiles
+        grid = self.keypad.render(labels=False)
+        self.assertEqual(grid.shape, (440, 540, 3))
+        numpy.testing.assert_array_equal(grid[:110, 180:360], tiles[1][..., ::-1])
+        numpy.testing.assert_array_equal(grid[330:, 180:360], tiles[9][..., ::-1])
+        self.assertFalse(grid[330:, :180].any())
+        labelled = self.keypad.render()
+        self.assertFalse((labelled[:110, :180] == grid[:110, :180]).all())
+        self.assertIs(keypad.get_font(), keypad.get_font())
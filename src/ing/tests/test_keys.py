@@ -0,0 +1,94 @@
+"""Test the RSA key pool works as expected."""
+import json
+import os
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from ing import keys
+from ing.api import IngApi
+
+
+class KeyPoolTestCase(SimpleTestCase):
+    """Test the RSA key pool works as expected."""
+
+    def make_pool(self, **kwargs):
+        """Return a pool which is closed after the test."""
+        key_pool = keys.KeyPool(**kwargs)
+        self.addCleanup(key_pool.close)
+        return key_pool
+
+    def wait_until_full(self, key_pool):
+        """Wait until the background thread has filled the pool."""
+        key_pool.start()
+        with key_pool._condition:  # pylint: disable=protected-access
+            key_pool._condition.wait_for(  # pylint: disable=protected-access
+                lambda: len(key_pool) >= key_pool.size, timeout=30
+            )
+        self.assertEqual(len(key_pool), key_pool.size)
+
+    def test_get(self):
+        """Keys are pre-generated and every key is only handed out once."""
+        key_pool = self.make_pool(size=2)
+        self.wait_until_full(key_pool)
+        moduli = {key_pool.get().n for _ in range(3)}
+        self.assertEqual(len(moduli), 3)
+
+    def test_closed(self):
+        """A closed pool still hands out (freshly generated) keys."""
+        key_pool = self.make_pool(size=1)
+        key_pool.close()
+        self.assertEqual(key_pool.get().size_in_bits(), keys.KEY_SIZE)
+        self.assertEqual(len(key_pool), 0)
+
+    def test_persist(self):
+        """Persisted keys are encrypted and claimed by the next pool."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "keys.json")
+            key_pool = self.make_pool(size=2, path=path, passphrase="secret")
+            self.wait_until_full(key_pool)
+            key_pool.close()
+            self.assertEqual(len(key_pool), 0)
+            with open(path) as fyle:
+                self.assertNotIn("PRIVATE KEY", fyle.read())
+
+            loaded = keys.KeyPool(size=2, path=path, passphrase="secret")
+            self.assertEqual(len(loaded), 2)
+            # e.g. another process, which may not hand out the same keys
+            self.assertEqual(len(keys.KeyPool(path=path, passphrase="secret")), 0)
+            loaded.close()
+            with open(path) as fyle:
+                self.assertIn("keys", json.load(fyle))
+            self.assertEqual(len(keys.KeyPool(path=path, passphrase="secret")), 2)
+
+            with self.assertLogs(keys.logger, "WARNING"):
+                wrong = keys.KeyPool(path=path, passphrase="wrong")
+            self.assertEqual(len(wrong), 0)
+
+    def test_fork(self):
+        """A forked process neither shares the keys nor lacks the thread."""
+        key_pool = self.make_pool(size=1)
+        # as the child of a process with a full pool sees it
+        key_pool._keys.append(
+            keys.generate_rsa_key()
+        )  # pylint: disable=protected-access
+        key_pool._thread = threading.Thread(  # pylint: disable=protected-access
+            target=lambda: None
+        )
+        keys._after_fork_in_child()  # pylint: disable=protected-access
+        self.assertEqual(len(key_pool), 0)
+        self.wait_until_full(key_pool)
+
+    def test_persist_requires_passphrase(self):
+        """Keys are never persisted unencrypted."""
+        with self.assertRaises(ValueError):
+            keys.KeyPool(path="keys.json")
+
+    def test_ing_api(self):
+        """The api takes its key from the pool."""
+        key_pool = self.make_pool(size=1)
+        self.wait_until_full(key_pool)
+        api = IngApi("12345678", key_pool=key_pool)
+        self.assertEqual(api.public_modulus, hex(api.key.n)[2:])
+        self.assertEqual(len(key_pool), 0)
@@ -0,0 +1,69 @@
+"""Test the metrics are snapshotted and merged as expected."""
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from ing import metrics
+
+
+class MetricsTestCase(SimpleTestCase):
+    """Test the metrics are snapshotted and merged as expected."""
+
+    def setUp(self):
+        """Start with no metrics."""
+        super().setUp()
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def test_merge(self):
+        """Counters and histograms are summed, and gauges take the highest."""
+        first, second = metrics.Registry(), metrics.Registry()
+        first.counter("calls", endpoint="/a").inc(2)
+        second.counter("calls", endpoint="/a").inc(3)
+        second.counter("calls", endpoint="/b").inc()
+        first.gauge("state").set(2)
+        second.gauge("state").set(0)
+        first.histogram("seconds").observe(0.2)
+        second.histogram("seconds").observe(3)
+        # as published and collected through redis
+        snapshots = [json.loads(json.dumps(r.snapshot())) for r in [first, second]]
+        merged = metrics.merge(snapshots)
+        self.assertEqual(
+            merged["calls"],
+            [
+                {"labels": {"endpoint": "/a"}, "type": "counter", "value": 5},
+                {"labels": {"endpoint": "/b"}, "type": "counter", "value": 1},
+            ],
+        )
+        self.assertEqual(merged["state"][0]["value"], 2)
+        histogram = merged["seconds"][0]["value"]
+        self.assertEqual(histogram["count"], 2)
+        self.assertAlmostEqual(histogram["sum"], 3.2)
+        self.assertEqual(histogram["max"], 3)
+        self.assertEqual(histogram["buckets"]["0.25"], 1)
+        self.assertEqual(histogram["buckets"]["inf"], 2)
+        # the snapshots are left as they were
+        self.assertEqual(snapshots[0]["calls"][0]["value"], 2)
+
+    def test_redis_unavailable(self):
+        """Only the process's own metrics are collected without redis."""
+        metrics.registry.counter("calls").inc()
+        exporter = metrics.MetricsExporter("redis://127.0.0.1:1/0")
+        with self.assertLogs("ing.metrics", "WARNING"):
+            exporter.publish()
+            self.assertEqual(exporter.collect(), metrics.registry.snapshot())
+
+    def test_command(self):
+        """The management command writes the metrics as json."""
+        metrics.registry.counter("calls").inc()
+        stdout = StringIO()
+        call_command("ing_metrics", stdout=stdout, stderr=StringIO())
+        self.assertEqual(json.loads(stdout.getvalue()), metrics.registry.snapshot())
+
+    def test_not_shared(self):
+        """Nothing is published unless metrics are shared through redis."""
+        metrics.set_metrics_exporter(None)
+        self.addCleanup(metrics.set_metrics_exporter, None)
+        self.assertIsNone(metrics.start_metrics_exporter())
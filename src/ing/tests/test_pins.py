@@ -0,0 +1,72 @@
+"""Test logging in without prompting works as expected."""
+import base64
+import json
+import os
+import tempfile
+
+from Crypto.Cipher import PKCS1_v1_5 as cipher_method
+from django.test import SimpleTestCase
+
+from ing import keys, pins
+from ing.api import IngApi
+from ing.tests.fakes import KEYPAD, SERVER_KEY, FakeTransport
+
+
+class PinsTestCase(SimpleTestCase):
+    """Test logging in without prompting works as expected."""
+
+    def test_pin_to_key_positions(self):
+        """Each digit of the pin is mapped to its position on the keypad."""
+        self.assertEqual(pins.pin_to_key_positions("0451", KEYPAD), "3,4,9,5")
+        with self.assertRaises(ValueError):
+            pins.pin_to_key_positions("0451", KEYPAD[:-1] + [7])
+        with self.assertRaises(ValueError):
+            pins.pin_to_key_positions("04a1", KEYPAD)
+
+    def test_headless_login(self):
+        """The pin's keypad positions are found with ocr and encrypted."""
+        key_pool = keys.KeyPool(size=1)
+        self.addCleanup(key_pool.close)
+        transport = FakeTransport()
+        api = IngApi(
+            "12345678",
+            key_pool=key_pool,
+            transport=transport,
+            pin_provider=pins.StaticPinProvider({"12345678": "2468"}),
+        )
+        api.login()
+        encrypted = base64.b64decode(transport.issued[0]["X-AuthPIN"])
+        key_positions = cipher_method.new(SERVER_KEY).decrypt(encrypted, None)
+        self.assertEqual(key_positions, b"1,4,8,6")
+
+    def test_environ_provider(self):
+        """Pins are read from the client's variable before the default."""
+        provider = pins.EnvironPinProvider(prefix="TEST_ING_PIN")
+        os.environ["TEST_ING_PIN"] = "1111"
+        self.addCleanup(os.environ.pop, "TEST_ING_PIN")
+        os.environ["TEST_ING_PIN_123"] = "2222"
+        self.addCleanup(os.environ.pop, "TEST_ING_PIN_123")
+        self.assertEqual(provider.get_pin("123"), "2222")
+        self.assertEqual(provider.get_pin("456"), "1111")
+        with self.assertRaises(LookupError):
+            pins.EnvironPinProvider(prefix="TEST_ING_NO_PIN").get_pin("123")
+        # without the fallback clients only use their own variable
+        provider = pins.EnvironPinProvider(prefix="TEST_ING_PIN", fallback=False)
+        self.assertEqual(provider.get_pin("123"), "2222")
+        with self.assertRaises(LookupError):
+            provider.get_pin("456")
+
+    def test_file_provider(self):
+        """Pins are only read from files private to their owner."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pins.json")
+            with open(path, "w") as fyle:
+                json.dump({"123": "9876"}, fyle)
+            provider = pins.FilePinProvider(path)
+            os.chmod(path, 0o600)
+            self.assertEqual(provider.get_pin("123"), "9876")
+            with self.assertRaises(LookupError):
+                provider.get_pin("456")
+            os.chmod(path, 0o644)
+            with self.assertRaises(PermissionError):
+                provider.get_pin("123")
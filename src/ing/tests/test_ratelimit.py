@@ -0,0 +1,84 @@
+"""Test the rate scheduler works as expected."""
+from django.test import SimpleTestCase
+
+from ing import ratelimit
+from ing.metrics import registry
+
+URL = "https://ing.test/KeypadService"
+
+
+class RateLimitTestCase(SimpleTestCase):
+    """Test the rate scheduler works as expected."""
+
+    def setUp(self):
+        """Start with no metrics."""
+        super().setUp()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_bucket(self):
+        """A bucket allows its burst, then waits for tokens to refill."""
+        bucket = ratelimit.TokenBucket(ratelimit.Budget(rate=10, burst=2))
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.1, places=2)
+
+    def test_reserve(self):
+        """Background calls leave the reserve for interactive calls."""
+        scheduler = ratelimit.RateScheduler({"default": (1, 4)})
+        background = ratelimit.Priority.BACKGROUND
+        scheduler.acquire(URL, background, timeout=0)
+        scheduler.acquire(URL, background, timeout=0)
+        with self.assertRaises(TimeoutError):
+            scheduler.acquire(URL, background, timeout=0)
+        scheduler.acquire(URL, timeout=0)
+        scheduler.acquire(URL, timeout=0)
+        with self.assertRaises(TimeoutError):
+            scheduler.acquire(URL, timeout=0)
+
+    def test_small_burst(self):
+        """Background calls are never starved by a burst too small to reserve."""
+        scheduler = ratelimit.RateScheduler({"default": (50, 1)})
+        background = ratelimit.Priority.BACKGROUND
+        scheduler.acquire(URL, background, timeout=0)
+        self.assertLess(scheduler.acquire(URL, background, timeout=1), 1)
+
+    def test_invalid_budget(self):
+        """Budgets which would never allow a call are rejected."""
+        for budget in [(0, 1), (1, 0), (-1, 5)]:
+            with self.subTest(budget=budget):
+                with self.assertRaises(ValueError):
+                    ratelimit.RateScheduler({"default": budget})
+
+    def test_budgets(self):
+        """Endpoints have their own budgets, and are unlimited without one."""
+        scheduler = ratelimit.RateScheduler({"/KeypadService": (1, 1)})
+        scheduler.acquire(URL, timeout=0)
+        with self.assertRaises(TimeoutError):
+            scheduler.acquire(URL, timeout=0)
+        # the same path on another host has its own bucket
+        scheduler.acquire("https://other.test/KeypadService", timeout=0)
+        for _ in range(10):
+            self.assertEqual(scheduler.acquire("https://ing.test/sts", timeout=0), 0)
+
+    def test_queue_time(self):
+        """The time calls wait is recorded."""
+        scheduler = ratelimit.RateScheduler({"default": (50, 1)})
+        scheduler.acquire(URL)
+        waited = scheduler.acquire(URL)
+        self.assertGreater(waited, 0)
+        histogram = registry.histogram(
+            "ing_rate_queue_seconds", endpoint="/KeypadService", priority="INTERACTIVE"
+        )
+        self.assertEqual(histogram.count, 2)
+        self.assertAlmostEqual(histogram.max, waited)
+
+    def test_redis_unavailable(self):
+        """Buckets are kept in process when redis cannot be used."""
+        scheduler = ratelimit.RateScheduler(
+            {"default": (1, 1)}, redis_url="redis://127.0.0.1:1/0"
+        )
+        with self.assertLogs("ing.ratelimit", "WARNING"):
+            scheduler.acquire(URL, timeout=0)
+            with self.assertRaises(TimeoutError):
+                scheduler.acquire(URL, timeout=0)
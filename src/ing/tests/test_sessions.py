@@ -0,0 +1,156 @@
+"""Tests for the ing-sessions endpoint."""
+import time
+
+from django.conf import settings
+from rest_framework import status
+
+from common.test.base import JsonApiTestCase
+from ing import keys, pins, tasks, tokens, transport, views
+from ing.fake_server import FakeIngServer
+from ing.models import IngAccount, IngSession
+from ing.tests import schemas
+from users.tests import factories
+
+
+class TestCase(JsonApiTestCase):
+    """Test logging in to ING in the background."""
+
+    schema = schemas.IngSessionsSchema
+
+    def test_user_create(self):
+        """Creating a session queues the login and returns immediately."""
+        user = factories.UserFactory()
+        IngAccount.objects.create(user=user, cif="12345678")
+        self.auth(user)
+        data = {"data": self.schema.get_data(cif="12345678")}
+        response = self.post(
+            f"/{self.resource_name}/",
+            data=data,
+            asserted_status=status.HTTP_202_ACCEPTED,
+            asserted_schema=self.schema.get_matcher(),
+        )
+        attributes = response.json()["data"]["attributes"]
+        self.assertEqual(attributes["status"], IngSession.PENDING)
+        self.assertEqual(attributes["token"], "")
+        session = IngSession.objects.get()
+        self.assertEqual(session.user, user)
+
+    def test_user_create_other(self):
+        """Users cannot log in to clients they do not own."""
+        IngAccount.objects.create(user=factories.UserFactory(), cif="12345678")
+        self.auth(factories.UserFactory())
+        for cif in ["12345678", "87654321"]:
+            with self.subTest(cif=cif):
+                data = {"data": self.schema.get_data(cif=cif)}
+                self.post(
+                    f"/{self.resource_name}/",
+                    data=data,
+                    asserted_status=status.HTTP_400_BAD_REQUEST,
+                )
+        self.assertFalse(IngSession.objects.exists())
+
+    def test_anon_create(self):
+        """Unauthenticated users cannot create sessions."""
+        data = {"data": self.schema.get_data(cif="12345678")}
+        self.post(
+            f"/{self.resource_name}/",
+            data=data,
+            asserted_status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_user_get_own(self):
+        """Users can only get their own sessions."""
+        user = factories.UserFactory()
+        other = IngSession.objects.create(user=factories.UserFactory(), cif="1")
+        session = IngSession.objects.create(user=user, cif="2")
+        self.auth(user)
+        response = self.get(
+            f"/{self.resource_name}/",
+            asserted_status=status.HTTP_200_OK,
+            asserted_schema=self.schema.get_matcher(many=True),
+        )
+        ids = [resource["id"] for resource in response.json()["data"]]
+        self.assertEqual(ids, [str(session.pk)])
+        self.get(
+            f"/{self.resource_name}/{other.pk}/",
+            asserted_status=status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_wait(self):
+        """Clients may wait a while for the login to finish."""
+        user = factories.UserFactory()
+        session = IngSession.objects.create(
+            user=user, cif="1", status=IngSession.FAILED, error="LookupError"
+        )
+        self.auth(user)
+        response = self.get(
+            f"/{self.resource_name}/{session.pk}/",
+            HTTP_PREFER="wait=5",
+            asserted_status=status.HTTP_200_OK,
+            asserted_schema=self.schema.get_matcher(),
+        )
+        self.assertEqual(response.json()["data"]["attributes"]["error"], "LookupError")
+
+    def test_wait_busy(self):
+        """Clients do not wait once too many requests are already waiting."""
+        user = factories.UserFactory()
+        session = IngSession.objects.create(user=user, cif="1")
+        waiters = views.get_waiters()
+        for _ in range(settings.ING_SESSION_MAX_WAITERS):
+            waiters.acquire()
+            self.addCleanup(waiters.release)
+        self.auth(user)
+        start = time.monotonic()
+        response = self.get(
+            f"/{self.resource_name}/{session.pk}/",
+            HTTP_PREFER="wait=5",
+            asserted_status=status.HTTP_200_OK,
+        )
+        self.assertLess(time.monotonic() - start, 1)
+        status_ = response.json()["data"]["attributes"]["status"]
+        self.assertEqual(status_, IngSession.PENDING)
+
+    def test_log_in(self):
+        """The task logs in, saving the token or the error."""
+        server = FakeIngServer(pins={"1": "1234"}, seed=1)
+        server.start()
+        self.addCleanup(server.stop)
+        pooled = transport.Transport()
+        self.addCleanup(pooled.close)
+        options = {
+            "token_store": tokens.TokenStore(),
+            "transport": pooled,
+            "pin_provider": pins.StaticPinProvider({"1": "1234", "2": "0000"}),
+            "base_url": server.base_url,
+            "key": keys.generate_rsa_key(),
+        }
+        user = factories.UserFactory()
+        for cif in ["1", "2"]:
+            IngAccount.objects.create(user=user, cif=cif)
+        session = IngSession.objects.create(user=user, cif="1")
+        tasks.log_in(session, **options)
+        session.refresh_from_db()
+        self.assertEqual(session.status, IngSession.SUCCEEDED)
+        self.assertTrue(session.token)
+        self.assertIsNotNone(session.expires_at)
+        session = IngSession.objects.create(user=user, cif="2")
+        tasks.log_in(session, **options)
+        session.refresh_from_db()
+        self.assertEqual(session.status, IngSession.FAILED)
+        self.assertIn("401", session.error)
+        # the token is not shared with other users, nor may they log in
+        session = IngSession.objects.create(user=factories.UserFactory(), cif="1")
+        tasks.log_in(session, **options)
+        session.refresh_from_db()
+        self.assertEqual(session.status, IngSession.FAILED)
+        self.assertTrue(session.error.startswith("PermissionError"))
+
+    def test_log_in_once(self):
+        """Only pending sessions are logged in, e.g. not redelivered tasks."""
+        session = IngSession.objects.create(
+            user=factories.UserFactory(), cif="1", status=IngSession.RUNNING
+        )
+        tasks.log_in_session(str(session.pk))
+        session.refresh_from_db()
+        self.assertEqual(session.status, IngSession.RUNNING)
+        self.assertEqual(session.error, "")
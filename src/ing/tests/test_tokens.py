@@ -0,0 +1,101 @@
+"""Test the token store works as expected."""
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ing import keys, tokens
+from ing.api import IngApi
+from ing.tests.fakes import FakeTransport
+
+
+class TokenStoreTestCase(SimpleTestCase):
+    """Test the token store works as expected."""
+
+    def test_expiry(self):
+        """Tokens are refreshed once they are about to expire."""
+        store = tokens.TokenStore(refresh_margin=60)
+        store.set("123", tokens.Token("fresh", time.time() + 120))
+        self.assertEqual(store.get("123").value, "fresh")
+        store.set("123", tokens.Token("stale", time.time() + 30))
+        self.assertIsNone(store.get("123"))
+        token = store.get_or_login(
+            "123", lambda: tokens.Token("refreshed", time.time() + 600)
+        )
+        self.assertEqual(token.value, "refreshed")
+        store.delete("123")
+        self.assertIsNone(store.get("123"))
+
+    def test_owner(self):
+        """Tokens stored for an owner are only returned to that owner."""
+        store = tokens.TokenStore()
+        store.set("123", tokens.Token("mine", time.time() + 600), owner="user-1")
+        self.assertEqual(store.get("123", owner="user-1").value, "mine")
+        self.assertIsNone(store.get("123", owner="user-2"))
+        self.assertIsNone(store.get("123"))
+        token = store.get_or_login(
+            "123", lambda: tokens.Token("theirs", time.time() + 600), owner="user-2"
+        )
+        self.assertEqual(token.value, "theirs")
+        self.assertEqual(store.get("123", owner="user-1").value, "mine")
+
+    def test_bounded(self):
+        """Expired and then the oldest tokens are forgotten, as are locks."""
+        store = tokens.TokenStore(max_local=2)
+        local = store._local  # pylint: disable=protected-access
+        store.set("1", tokens.Token("expired", time.time() - 1))
+        for cif in ["2", "3"]:
+            store.get_or_login(cif, lambda: tokens.Token(cif, time.time() + 600))
+        self.assertEqual(list(local), ["2", "3"])
+        store.set("4", tokens.Token("4", time.time() + 600))
+        self.assertEqual(list(local), ["3", "4"])
+        login_locks = store._login_locks  # pylint: disable=protected-access
+        self.assertEqual(len(login_locks), 0)
+
+    def test_from_response(self):
+        """Tokens expire when ING says, or after the default time to live."""
+        token = tokens.Token.from_response({"Token": "abc", "ExpiresIn": 300}, now=0)
+        self.assertEqual(token, tokens.Token("abc", 300))
+        token = tokens.Token.from_response({"Token": "abc"}, now=0)
+        self.assertEqual(token.expires_at, tokens.DEFAULT_TOKEN_TTL)
+
+    def test_single_flight(self):
+        """Concurrent callers for one client share a single login."""
+        store = tokens.TokenStore()
+        logins = []
+        started = threading.Event()
+
+        def login():
+            logins.append(threading.get_ident())
+            started.set()
+            time.sleep(0.05)
+            return tokens.Token(f"token-{len(logins)}", time.time() + 600)
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(store.get_or_login("123", login).value)
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(logins), 1)
+        self.assertEqual(results, ["token-1"] * 8)
+        # other clients are not held up by the lock
+        self.assertEqual(store.get_or_login("456", login).value, "token-2")
+
+    def test_ing_api(self):
+        """Clients share the token of the first to log in."""
+        key_pool = keys.KeyPool(size=2)
+        self.addCleanup(key_pool.close)
+        transport = FakeTransport()
+        store = tokens.TokenStore()
+        for _ in range(2):
+            api = IngApi("123", key_pool=key_pool, transport=transport)
+            api.get_encrypted_pin = lambda: "encrypted"
+            self.assertEqual(api.get_token(store).value, "token-123")
+            self.assertEqual(api.token, "token-123")
+        self.assertEqual(len(transport.issued), 1)
@@ -0,0 +1,131 @@
+"""Test the pooled http transport works as expected."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from ing import transport
+from ing.breaker import CircuitBreakers, CircuitOpenError
+from ing.metrics import registry
+from ing.ratelimit import RateScheduler
+
+
+class PortHandler(BaseHTTPRequestHandler):
+    """Respond with the client's port, so connection reuse can be seen."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Respond with the client's port and set a cookie."""
+        self.server.paths.append(self.path)
+        if self.path.startswith("/fail"):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/slow" and self.server.delays:
+            time.sleep(self.server.delays.pop(0))
+        body = json.dumps({"port": self.client_address[1]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=secret")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the test output quiet."""
+
+
+class TransportTestCase(SimpleTestCase):
+    """Test the pooled http transport works as expected."""
+
+    def setUp(self):
+        """Serve requests from a local server."""
+        super().setUp()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), PortHandler)
+        server.daemon_threads = True
+        # the paths requested, and how long the next requests for /slow take
+        server.paths, server.delays = [], []
+        self.server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}/"
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_reuse(self):
+        """Requests from every thread reuse the pool's connections."""
+        pooled = transport.Transport(pool_maxsize=1, pool_block=True)
+        self.addCleanup(pooled.close)
+        ports = [pooled.get(self.url).json()["port"] for _ in range(3)]
+        thread = threading.Thread(
+            target=lambda: ports.append(pooled.get(self.url).json()["port"])
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(len(set(ports)), 1)
+
+    def test_cookies(self):
+        """Cookies are never kept between requests."""
+        pooled = transport.Transport()
+        self.addCleanup(pooled.close)
+        pooled.get(self.url)
+        self.assertEqual(len(pooled.session.cookies), 0)
+
+    def test_timeout(self):
+        """The transport's timeout is used unless one is given."""
+        pooled = transport.Transport(timeout=1.5)
+        self.addCleanup(pooled.close)
+        timeouts = []
+        pooled.session.request = lambda *args, **kwargs: timeouts.append(
+            kwargs["timeout"]
+        )
+        pooled.get(self.url)
+        pooled.get(self.url, timeout=5)
+        self.assertEqual(timeouts, [1.5, 5])
+
+    def test_breaker(self):
+        """Requests fail fast once a service has failed too often in a row."""
+        breakers = CircuitBreakers(failure_threshold=2, reset_timeout=0.1)
+        pooled = transport.Transport(breakers=breakers)
+        self.addCleanup(pooled.close)
+        for _ in range(2):
+            self.assertEqual(pooled.get(f"{self.url}fail").status_code, 503)
+        with self.assertRaises(CircuitOpenError):
+            pooled.get(f"{self.url}fail")
+        self.assertEqual(len(self.server.paths), 2)
+        # other services are still called
+        pooled.get(f"{self.url}slow")
+        time.sleep(0.1)
+        self.assertEqual(pooled.get(f"{self.url}fail/probe").status_code, 503)
+        with self.assertRaises(CircuitOpenError):
+            pooled.get(f"{self.url}fail")
+
+    def test_hedge(self):
+        """Slow GET requests are sent again, using the first response."""
+        self.server.delays = [2]
+        pooled = transport.Transport(hedge_after=0.05)
+        self.addCleanup(pooled.close)
+        start = time.monotonic()
+        self.assertEqual(pooled.get(f"{self.url}slow").status_code, 200)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.server.paths, ["/slow", "/slow"])
+        self.assertEqual(registry.counter("ing_hedges", endpoint="/slow").value, 1)
+        self.assertEqual(registry.counter("ing_hedge_wins", endpoint="/slow").value, 1)
+        # fast requests are not hedged
+        pooled.get(f"{self.url}slow")
+        self.assertEqual(registry.counter("ing_hedges", endpoint="/slow").value, 1)
+
+    def test_rate_timeout(self):
+        """Requests wait at most the rate timeout for the scheduler."""
+        scheduler = RateScheduler({"default": (0.1, 1)})
+        pooled = transport.Transport(scheduler=scheduler, rate_timeout=0.5)
+        self.addCleanup(pooled.close)
+        pooled.get(self.url)
+        with self.assertRaises(TimeoutError):
+            pooled.get(self.url)
+        self.assertEqual(self.server.paths, ["/"])
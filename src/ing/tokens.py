@@ -0,0 +1,228 @@
+"""
+Cache of the auth tokens issued by ING's STS, keyed by cif (and owner).
+
+Logging in (fetching the keypad, ocr, RSA and the STS round trip) is only
+needed when there is no token for the client which is valid for a while yet.
+Tokens are kept in a per process tier and optionally in redis so that every
+worker shares them. Only one login per client runs at a time: concurrent
+callers within a process wait on a lock, and workers on a redis lock, then
+share the token the first caller was issued.
+"""
+import json
+import logging
+import threading
+import time
+import weakref
+from typing import Callable, Dict, NamedTuple, Optional
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# seconds a token is assumed to be valid for when ING does not say
+DEFAULT_TOKEN_TTL = 10 * 60
+
+
+class Token(NamedTuple):
+    """An auth token and when (as a unix timestamp) it expires."""
+
+    value: str
+    expires_at: float
+
+    @classmethod
+    def from_response(cls, data: dict, now: Optional[float] = None) -> "Token":
+        """Return the token of a response from the STS `issue` endpoint."""
+        now = time.time() if now is None else now
+        ttl = float(data.get("ExpiresIn") or DEFAULT_TOKEN_TTL)
+        return cls(data["Token"], now + ttl)
+
+    def is_fresh(self, margin: float = 0, now: Optional[float] = None) -> bool:
+        """Return whether the token is still valid `margin` seconds from now."""
+        now = time.time() if now is None else now
+        return self.expires_at - margin > now
+
+
+class TokenStore:
+    """Two tier (in process and optional redis) store of tokens."""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "ing-token",
+        refresh_margin: float = 60,
+        lock_timeout: float = 30,
+        max_local: int = 10000,
+    ):
+        """
+        Initialise the store, connecting lazily to redis if a url is given.
+
+        Tokens expiring within `refresh_margin` seconds are refreshed rather
+        than handed out. A login holding the lock for longer than
+        `lock_timeout` seconds is assumed to have died. At most `max_local`
+        tokens are kept in process, forgetting expired and then the oldest.
+        """
+        self.key_prefix = key_prefix
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self.max_local = max_local
+        self._local: Dict[str, Token] = {}
+        self._lock = threading.Lock()
+        # only kept while a login is running or waited on
+        self._login_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+
+    @staticmethod
+    def _name(cif: str, owner: Optional[str]) -> str:
+        return cif if owner is None else f"{owner}:{cif}"
+
+    def _redis_key(self, name: str) -> str:
+        return f"{self.key_prefix}:{name}"
+
+    def _is_fresh(self, token: Optional[Token]) -> bool:
+        return token is not None and token.is_fresh(self.refresh_margin)
+
+    def _remember(self, name: str, token: Token):
+        with self._lock:
+            self._local[name] = token
+            if len(self._local) <= self.max_local:
+                return
+            now = time.time()
+            for expired, stored in list(self._local.items()):
+                if not stored.is_fresh(now=now):
+                    del self._local[expired]
+            while len(self._local) > self.max_local:
+                del self._local[next(iter(self._local))]
+
+    def get(self, cif: str, owner: Optional[str] = None) -> Optional[Token]:
+        """
+        Return the client's token, or None if it has none which is fresh.
+
+        Tokens stored for an owner (e.g. the user who logged in) are only
+        returned to that owner.
+        """
+        name = self._name(cif, owner)
+        token = self._local.get(name)
+        if self._is_fresh(token):
+            return token
+        if token is not None:
+            self._local.pop(name, None)
+        if self._redis is None:
+            return None
+        try:
+            value = self._redis.get(self._redis_key(name))
+        except redis.RedisError:
+            logger.warning("Unable to read from the ing token store.", exc_info=True)
+            return None
+        if value is None:
+            return None
+        token = Token(*json.loads(value))
+        if not self._is_fresh(token):
+            return None
+        self._remember(name, token)
+        return token
+
+    def set(self, cif: str, token: Token, owner: Optional[str] = None):
+        """Store the client's token until it expires."""
+        name = self._name(cif, owner)
+        self._remember(name, token)
+        if self._redis is None:
+            return
+        ttl = int(token.expires_at - time.time())
+        if ttl <= 0:
+            return
+        try:
+            self._redis.set(self._redis_key(name), json.dumps(token), ex=ttl)
+        except redis.RedisError:
+            logger.warning("Unable to write to the ing token store.", exc_info=True)
+
+    def delete(self, cif: str, owner: Optional[str] = None):
+        """Forget the client's token (e.g. when ING has rejected it)."""
+        name = self._name(cif, owner)
+        self._local.pop(name, None)
+        if self._redis is None:
+            return
+        try:
+            self._redis.delete(self._redis_key(name))
+        except redis.RedisError:
+            logger.warning("Unable to write to the ing token store.", exc_info=True)
+
+    def get_or_login(
+        self, cif: str, login: Callable[[], Token], owner: Optional[str] = None
+    ) -> Token:
+        """
+        Return the client's token, calling `login` for a new one if necessary.
+
+        Only one caller logs in per client (and owner) at a time, any others
+        wait for and then share its token.
+        """
+        token = self.get(cif, owner)
+        if token is not None:
+            return token
+        name = self._name(cif, owner)
+        with self._lock:
+            login_lock = self._login_locks.setdefault(name, threading.Lock())
+        with login_lock:
+            token = self.get(cif, owner)
+            if token is not None:
+                return token
+            if self._redis is None:
+                return self._login(cif, login, owner)
+            try:
+                lock = self._redis.lock(
+                    f"{self._redis_key(name)}:lock",
+                    timeout=self.lock_timeout,
+                    blocking_timeout=self.lock_timeout,
+                )
+                acquired = lock.acquire()
+            except redis.RedisError:
+                logger.warning("Unable to lock the ing token store.", exc_info=True)
+                return self._login(cif, login, owner)
+            try:
+                # another worker may have logged in while this one waited (even
+                # if this one gave up waiting for the lock)
+                token = self.get(cif, owner)
+                if token is not None:
+                    return token
+                return self._login(cif, login, owner)
+            finally:
+                if acquired:
+                    try:
+                        lock.release()
+                    except redis.RedisError:
+                        logger.warning(
+                            "Unable to unlock the ing token store.", exc_info=True
+                        )
+
+    def _login(
+        self, cif: str, login: Callable[[], Token], owner: Optional[str]
+    ) -> Token:
+        token = login()
+        self.set(cif, token, owner)
+        return token
+
+
+_token_store: Optional[TokenStore] = None
+
+
+def get_token_store() -> TokenStore:
+    """
+    Return the process wide token store.
+
+    The redis tier is used when django is configured with `ING_TOKEN_REDIS_URL`.
+    """
+    global _token_store  # pylint: disable=global-statement
+    if _token_store is None:
+        redis_url = None
+        if settings.configured:
+            redis_url = getattr(settings, "ING_TOKEN_REDIS_URL", None)
+        _token_store = TokenStore(redis_url=redis_url)
+    return _token_store
+
+
+def set_token_store(token_store: Optional[TokenStore]):
+    """Set the process wide token store (None to configure it again)."""
+    global _token_store  # pylint: disable=global-statement
+    _token_store = token_store
@@ -0,0 +1,237 @@
+"""
+Pooled http connections for talking to ING.
+
+Every request made through a transport reuses a warm (keep-alive) connection
+from one shared, thread safe connection pool, rather than opening a new tcp
+and tls connection. Sessions are not thread safe so each thread has its own,
+but they all share the transport's pool, timeouts and retry policy.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ing.breaker import CircuitBreakers, get_circuit_breakers
+from ing.metrics import registry
+from ing.ratelimit import Priority, RateScheduler, get_rate_scheduler
+
+# seconds to wait to connect and to wait between bytes of the response
+DEFAULT_TIMEOUT = (3.05, 30)
+# statuses which are worth retrying (ING's proxies return these when busy)
+RETRY_STATUSES = (502, 503, 504)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def retry_policy(total: int, backoff_factor: float = 0.3) -> Retry:
+    """
+    Return a policy retrying failed connections and busy responses.
+
+    Only idempotent requests are retried after the request has been sent, so a
+    login is never submitted twice.
+    """
+    return Retry(
+        total=total,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False,
+    )
+
+
+class Transport:
+    """Thread safe pool of http connections shared between api clients."""
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        retries: Optional[Retry] = None,
+        pool_block: bool = False,
+        scheduler: Optional[RateScheduler] = None,
+        breakers: Optional[CircuitBreakers] = None,
+        hedge_after: Optional[float] = None,
+        rate_timeout: Optional[float] = None,
+    ):
+        """
+        Configure the connection pool.
+
+        `pool_maxsize` connections are kept alive per host. When `pool_block` is
+        set, requests wait for a free connection rather than opening (and then
+        discarding) extra ones. Requests wait for the scheduler, if given, to
+        keep within ING's rate limits (raising TimeoutError rather than waiting
+        longer than `rate_timeout` seconds), and fail fast while the breakers,
+        if given, are open. GET requests without a response after `hedge_after`
+        seconds are sent again, and whichever response arrives first is used.
+        """
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.breakers = breakers
+        self.hedge_after = hedge_after
+        self.rate_timeout = rate_timeout
+        self.pool_maxsize = pool_maxsize
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.adapter = HTTPAdapter(
+            pool_maxsize=pool_maxsize,
+            max_retries=retries if retries is not None else 0,
+            pool_block=pool_block,
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """Return this thread's session, which uses the shared pool."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            # ING authenticates with headers, and cookies must never leak from
+            # one client's login into another's
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send a request, with the transport's timeout unless one is given.
+
+        The request is scheduled with the priority when rates are limited.
+        Raises CircuitOpenError without sending it while the service's breaker
+        is open.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        breaker = self.breakers.get(url) if self.breakers is not None else None
+        if breaker is not None:
+            breaker.before()
+        try:
+            if method == "GET" and self.hedge_after is not None:
+                response = self._hedged_send(url, priority, kwargs)
+            else:
+                response = self._send(method, url, priority, kwargs)
+        except requests.RequestException:
+            if breaker is not None:
+                breaker.failure()
+            raise
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.failure()
+            else:
+                breaker.success()
+        return response
+
+    def _send(
+        self, method: str, url: str, priority: Priority, kwargs: Dict[str, Any]
+    ) -> requests.Response:
+        if self.scheduler is not None:
+            self.scheduler.acquire(url, priority, self.rate_timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=2 * self.pool_maxsize,
+                        thread_name_prefix="ing-hedge",
+                    )
+        return self._executor
+
+    def _hedged_send(
+        self, url: str, priority: Priority, kwargs: Dict[str, Any]
+    ) -> requests.Response:
+        executor = self._get_executor()
+        first = executor.submit(self._send, "GET", url, priority, kwargs)
+        if wait([first], timeout=self.hedge_after).done:
+            return first.result()
+        path = urlsplit(url).path
+        registry.counter("ing_hedges", endpoint=path).inc()
+        second = executor.submit(self._send, "GET", url, priority, kwargs)
+        error: Optional[Exception] = None
+        for future in as_completed([first, second]):
+            try:
+                response = future.result()
+            except requests.RequestException as exception:
+                error = exception
+                continue
+            if future is second:
+                registry.counter("ing_hedge_wins", endpoint=path).inc()
+            # release the slower request's connection once it has finished
+            (second if future is first else first).add_done_callback(_discard)
+            return response
+        raise error
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close every pooled connection."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.adapter.close()
+
+
+def _discard(future: Future):
+    """Close the response of a request whose result is not needed."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+_transport_lock = threading.Lock()
+_transport: Optional[Transport] = None
+
+
+def get_transport() -> Transport:
+    """
+    Return the process wide transport.
+
+    When django is configured the pool holds `ING_HTTP_POOL_SIZE` connections,
+    requests time out after `ING_HTTP_TIMEOUT` seconds, are retried up to
+    `ING_HTTP_RETRIES` times, are limited to the `ING_RATE_LIMITS` (waiting at
+    most `ING_RATE_LIMIT_TIMEOUT` seconds) and fail fast while a service is
+    unhealthy (see `get_circuit_breakers`). GET requests are hedged after
+    `ING_HTTP_HEDGE_AFTER` seconds, if set.
+    """
+    global _transport  # pylint: disable=global-statement
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                options = {}
+                if settings.configured:
+                    retries = getattr(settings, "ING_HTTP_RETRIES", 0)
+                    options = {
+                        "pool_maxsize": getattr(settings, "ING_HTTP_POOL_SIZE", 10),
+                        "timeout": getattr(settings, "ING_HTTP_TIMEOUT", None)
+                        or DEFAULT_TIMEOUT,
+                        "retries": retry_policy(retries) if retries else None,
+                        "scheduler": get_rate_scheduler(),
+                        "breakers": get_circuit_breakers(),
+                        "hedge_after": getattr(settings, "ING_HTTP_HEDGE_AFTER", None),
+                        "rate_timeout": getattr(
+                            settings, "ING_RATE_LIMIT_TIMEOUT", None
+                        ),
+                    }
+                _transport = Transport(**options)
+    return _transport
+
+
+def set_transport(transport: Optional[Transport]):
+    """Set the process wide transport (None to configure it again)."""
+    global _transport  # pylint: disable=global-statement
+    _transport = transport
@@ -0,0 +1,96 @@
+"""Views for the ing app."""
+import re
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import mixins, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+from rest_framework_json_api.views import AutoPrefetchMixin, PreloadIncludesMixin
+
+from ing import tasks
+from ing.models import IngSession
+from ing.serializers import IngSessionSerializer
+
+# seconds between checks of whether a login being waited on has finished
+POLL_INTERVAL = 0.25
+# e.g. "Prefer: wait=10" (https://tools.ietf.org/html/rfc7240#section-4.3)
+PREFER_WAIT = re.compile(r"(?:^|[,;\s])wait=(\d+(?:\.\d+)?)")
+
+_waiters_lock = threading.Lock()
+_waiters: Optional[threading.BoundedSemaphore] = None
+
+
+def get_waiters() -> threading.BoundedSemaphore:
+    """Return the process wide semaphore of requests waiting for a login."""
+    global _waiters  # pylint: disable=global-statement
+    if _waiters is None:
+        with _waiters_lock:
+            if _waiters is None:
+                _waiters = threading.BoundedSemaphore(settings.ING_SESSION_MAX_WAITERS)
+    return _waiters
+
+
+class IngSessionView(
+    AutoPrefetchMixin,
+    PreloadIncludesMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    GenericViewSet,
+):
+    """
+    ViewSet for the ing-sessions endpoint.
+
+    Creating a session queues a login to ING and returns immediately, clients
+    then poll the session until it has succeeded or failed. A client may wait
+    for the login to finish (up to `ING_SESSION_MAX_WAIT` seconds) with a
+    `Prefer: wait=<seconds>` header, unless `ING_SESSION_MAX_WAITERS` requests
+    in the process are already waiting, as each ties up a worker's thread.
+    """
+
+    queryset = IngSession.objects.all()
+    serializer_class = IngSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self, *args, **kwargs):
+        """Filter queryset to the user's sessions."""
+        return super().get_queryset(*args, **kwargs).filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """Queue the login, responding that it has been accepted."""
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def perform_create(self, serializer):
+        """Save the session and log in once it has been committed."""
+        session = serializer.save(user=self.request.user)
+        transaction.on_commit(lambda: tasks.log_in_session.delay(str(session.pk)))
+
+    def get_wait(self) -> float:
+        """Return the seconds the client prefers to wait for the login."""
+        match = PREFER_WAIT.search(self.request.META.get("HTTP_PREFER", ""))
+        if match is None:
+            return 0
+        return min(float(match.group(1)), settings.ING_SESSION_MAX_WAIT)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the session, once its login has finished if it prefers to wait."""
+        instance = self.get_object()
+        wait = self.get_wait()
+        waiters = get_waiters()
+        if wait and not instance.is_finished and waiters.acquire(blocking=False):
+            try:
+                deadline = time.monotonic() + wait
+                while not instance.is_finished and time.monotonic() < deadline:
+                    time.sleep(POLL_INTERVAL)
+                    instance.refresh_from_db()
+            finally:
+                waiters.release()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
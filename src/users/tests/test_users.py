@@ -1,6 +1,8 @@
 """Tests for users endpoint."""
 from __future__ import annotations
 
+from json import loads
+
 from rest_framework import status
 
 from common.test.base import JsonApiTestCase
@@ -82,6 +84,37 @@ class TestCase(JsonApiTestCase):
         self.assertEqual(json["data"]["id"], str(other_user.pk))
         self.assertEqual(json["data"]["attributes"]["email"], other_user.email)
 
+    def test_uwp_stream(self):
+        """User with perms can stream the list of every user."""
+        user = factories.UserFactory(permission_codes=["users.view_user"])
+        factories.UserFactory.create_batch(4)
+        self.auth(user)
+        listed = self.get(
+            f"/{self.resource_name}/",
+            {"page[size]": 100},
+            asserted_status=status.HTTP_200_OK,
+        ).json()
+        response = self.get(
+            f"/{self.resource_name}/",
+            {"page[stream]": "true"},
+            asserted_status=status.HTTP_200_OK,
+        )
+        # check the list is streamed, matching the paginated list
+        self.assertTrue(response.streaming)
+        json = loads(b"".join(response.streaming_content))
+        self.assertThat(json, self.schema.get_matcher(many=True))
+        self.assertEqual(json["data"], listed["data"])
+        self.assertEqual(len(json["data"]), User.objects.count())
+
+    def test_user_stream_self(self):
+        """User can only stream themselves."""
+        user = factories.UserFactory()
+        factories.UserFactory()
+        self.auth(user)
+        response = self.get(f"/{self.resource_name}/", {"page[stream]": "true"})
+        json = loads(b"".join(response.streaming_content))
+        self.assertEqual([item["id"] for item in json["data"]], [str(user.pk)])
+
     def test_user_patch_other(self):
         """User cannot update other users."""
         password = "pass"
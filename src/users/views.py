@@ -14,6 +14,7 @@ from rest_framework_json_api.views import (
     RelatedMixin,
 )
 
+from common.views import StreamingListModelMixin
 from users.models import User
 from users.serializers import SessionSerializer, UserSerializer
 
@@ -70,10 +71,10 @@ class UserView(
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
-    mixins.ListModelMixin,
+    StreamingListModelMixin,
     GenericViewSet,
 ):
-    """ViewSet for the users endpoint."""
+    """ViewSet for the users endpoint, which can stream the whole list."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -1,7 +1,16 @@
 """Bootstrap celery with Django's config."""
 from celery import Celery
+from celery.signals import worker_process_init
 from django.conf import settings
 
+from ing.metrics import start_metrics_exporter
+
 app = Celery(settings.CELERY_APP_NAME)
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def start_worker_metrics(**kwargs):
+    """Publish each worker process's metrics of its calls to ING."""
+    start_metrics_exporter()
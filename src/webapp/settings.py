@@ -74,6 +74,7 @@ INSTALLED_APPS = [
     "webapp.apps.WebAppConfig",
     "common.apps.CommonConfig",
     "users.apps.UsersConfig",
+    "ing.apps.IngConfig",
     # Our defaults
     "corsheaders",
     "anymail",
@@ -181,6 +182,54 @@ MAILGUN_API_KEY = env("MAILGUN_API_KEY")
 # Misc
 FRONTEND_URL = SITE_URL
 
+# OCR
+# NOTE: When set, recognised keypad digits are shared between all workers
+OCR_CACHE_REDIS_URL = env("OCR_CACHE_REDIS_URL", default=None)
+# Defaults to one worker process per core
+OCR_MAX_WORKERS = env.int("OCR_MAX_WORKERS", default=None)
+# The most ocr jobs each asyncio event loop may run at once (default: workers)
+OCR_MAX_CONCURRENCY = env.int("OCR_MAX_CONCURRENCY", default=None)
+
+# ING
+# NOTE: Point at a fake server (see ing.fake_server) to run offline
+ING_BASE_URL = env("ING_BASE_URL", default="https://www.ing.com.au")
+# The number of RSA keys generated ahead of logins
+ING_KEY_POOL_SIZE = env.int("ING_KEY_POOL_SIZE", default=8)
+# NOTE: When set, pre-generated keys are persisted (encrypted) across restarts
+ING_KEY_POOL_PATH = env("ING_KEY_POOL_PATH", default=None)
+ING_KEY_POOL_PASSPHRASE = env("ING_KEY_POOL_PASSPHRASE", default=SECRET_KEY)
+# Connections kept alive to ING, and requests' timeout (seconds) and retries
+ING_HTTP_POOL_SIZE = env.int("ING_HTTP_POOL_SIZE", default=10)
+# Defaults to 3.05 seconds to connect and 30 seconds to read
+ING_HTTP_TIMEOUT = env.float("ING_HTTP_TIMEOUT", default=None)
+ING_HTTP_RETRIES = env.int("ING_HTTP_RETRIES", default=2)
+# NOTE: When set, GET requests slower than this (seconds) are sent again
+ING_HTTP_HEDGE_AFTER = env.float("ING_HTTP_HEDGE_AFTER", default=None)
+# Failures in a row before calls to a service fail fast (0 to never), and the
+# seconds until it is tried again
+ING_BREAKER_FAILURES = env.int("ING_BREAKER_FAILURES", default=5)
+ING_BREAKER_RESET_TIMEOUT = env.float("ING_BREAKER_RESET_TIMEOUT", default=30)
+# NOTE: Background logins read pins from this json file (cif to pin) when set,
+# and otherwise from $ING_PIN_<cif>
+ING_PIN_FILE = env("ING_PIN_FILE", default=None)
+# The longest (seconds) a request may wait for a background login to finish
+ING_SESSION_MAX_WAIT = env.float("ING_SESSION_MAX_WAIT", default=2)
+# The most requests each process lets wait at once (others return immediately)
+ING_SESSION_MAX_WAITERS = env.int("ING_SESSION_MAX_WAITERS", default=2)
+# NOTE: When set, auth tokens are shared between all workers
+ING_TOKEN_REDIS_URL = env("ING_TOKEN_REDIS_URL", default=None)
+# Requests per second and burst allowed to each endpoint (path, or "default"),
+# e.g. {"default": [5, 10]} (default: unlimited)
+ING_RATE_LIMITS = env.json("ING_RATE_LIMITS", default={})
+# NOTE: When set, the rate limits are shared between all workers
+ING_RATE_LIMIT_REDIS_URL = env("ING_RATE_LIMIT_REDIS_URL", default=None)
+# The longest (seconds) a request may wait for its turn within the rate limits
+ING_RATE_LIMIT_TIMEOUT = env.float("ING_RATE_LIMIT_TIMEOUT", default=30)
+# NOTE: When set, every worker's metrics are published (every interval seconds)
+# to be collected with the ing_metrics management command
+ING_METRICS_REDIS_URL = env("ING_METRICS_REDIS_URL", default=None)
+ING_METRICS_INTERVAL = env.float("ING_METRICS_INTERVAL", default=15)
+
 # Django-axes
 AXES_HANDLER = "axes.handlers.cache.AxesCacheHandler"
 AXES_CACHE = "axes"
@@ -234,11 +283,11 @@ REST_FRAMEWORK = {
     ],
     "EXCEPTION_HANDLER": "rest_framework_json_api.exceptions.exception_handler",
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework_json_api.parsers.JSONParser",
+        "common.parsers.JSONParser",
         "rest_framework.parsers.FormParser",
         "rest_framework.parsers.MultiPartParser",
     ],
-    "DEFAULT_RENDERER_CLASSES": ["rest_framework_json_api.renderers.JSONRenderer"],
+    "DEFAULT_RENDERER_CLASSES": ["common.renderers.JSONRenderer"],
     "DEFAULT_METADATA_CLASS": "rest_framework_json_api.metadata.JSONAPIMetadata",
     "DEFAULT_FILTER_BACKENDS": [
         "rest_framework_json_api.filters.QueryParameterValidationFilter",
@@ -1,13 +1,19 @@
 """Ensure pagination is enabled."""
 import json
+from urllib.parse import parse_qsl, urlsplit
 
 from django.test import SimpleTestCase
+from django.test import TestCase as DatabaseTestCase
 from hamcrest import all_of, assert_that, has_entry, has_key
 from rest_framework import serializers, status
 from rest_framework.permissions import AllowAny
 from rest_framework.test import APIRequestFactory
 from rest_framework_json_api.views import ModelViewSet
 
+from common.pagination import JsonApiCursorPagination
+from users.models import User
+from users.tests.factories import UserFactory
+
 
 class Serializer(serializers.Serializer):
     """Test serializer."""
@@ -30,6 +36,23 @@ class View(ModelViewSet):
         return []
 
 
+class CursorPagination(JsonApiCursorPagination):
+    """Small pages, to test paging through a few users."""
+
+    page_size = 2
+
+
+class CursorView(ModelViewSet):
+    """Test view paginated by cursor."""
+
+    permission_classes = [AllowAny]
+    serializer_class = Serializer
+    pagination_class = CursorPagination
+    queryset = User.objects.all()
+    resource_name = "users"
+    ordering = ["pk"]
+
+
 def get_json_from_response(response):
     """Ensure the response is rendered and return the content as json."""
     if not response.is_rendered:
@@ -75,3 +98,36 @@ class TestCase(SimpleTestCase):
             resp_json,
             has_entry("links", all_of(*[has_key(key) for key in pagination_keys])),
         )
+
+
+class CursorTestCase(DatabaseTestCase):
+    """Ensure cursor pagination pages through results in order."""
+
+    def get_page(self, url="/", query_count=1):
+        """Return the json of the page at the url."""
+        parts = urlsplit(url)
+        request = APIRequestFactory().get(parts.path, dict(parse_qsl(parts.query)))
+        with self.assertNumQueries(query_count):
+            response = CursorView.as_view({"get": "list"})(request)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return get_json_from_response(response)
+
+    def test_cursor_pagination(self):
+        """Pages follow on without counting or offsetting, and lead back."""
+        ids = [str(UserFactory().pk) for _ in range(5)]
+        pages = [self.get_page()]
+        while pages[-1]["links"]["next"]:
+            pages.append(self.get_page(pages[-1]["links"]["next"]))
+        self.assertEqual([item["id"] for page in pages for item in page["data"]], ids)
+        self.assertIsNone(pages[0]["links"]["prev"])
+        self.assertNotIn("count", pages[-1]["meta"]["pagination"])
+        previous = self.get_page(pages[-1]["links"]["prev"])
+        self.assertEqual(previous["data"], pages[-2]["data"])
+
+    def test_count(self):
+        """The total count is included when enabled."""
+        UserFactory()
+        CursorPagination.include_count = True
+        self.addCleanup(setattr, CursorPagination, "include_count", False)
+        page = self.get_page(query_count=2)
+        self.assertEqual(page["meta"]["pagination"]["count"], 1)